@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import db, slow_queries
+        connection_created.connect(db.apply_sqlite_pragmas)
+        if settings.SLOW_QUERY_MS is not None:
+            connection_created.connect(slow_queries.install)
@@ -0,0 +1,76 @@
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import replicas
+
+# Set in the shell context: {% hole %} then leaves a marker
+SHELL = 'donut_shell'
+# Autoescaped user text can never produce "<!--"
+MARKER = '<!--hole:{}-->'
+MARKER_RE = re.compile(r'<!--hole:([\w/.-]+)-->')
+
+
+def marker(template_name):
+    return mark_safe(MARKER.format(template_name))
+
+
+def shell_key(request):
+    """Ключ общей части страницы: адрес и версии ее лент или None."""
+    # Set by views' ETag functions, absent for pages that answer 404
+    versions = getattr(request, 'cache_versions', None)
+    if not versions:
+        return None
+    parts = [request.get_full_path()]
+    parts += [f'{key}@{version}' for key, version in sorted(versions.items())]
+    digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    return f'donut:{digest}'
+
+
+def fill(request, shell, context):
+    """Подставляет в оболочку отрисованные для зрителя дырки."""
+    rendered = {}
+
+    def hole(match):
+        name = match.group(1)
+        if name not in rendered:
+            rendered[name] = render_to_string(name, context, request)
+        return rendered[name]
+
+    return MARKER_RE.sub(hole, shell)
+
+
+def resolve(context):
+    if callable(context):
+        return context()
+    return context or {}
+
+
+def render(request, template_name, shared, context=None):
+    """
+    Страница из общей оболочки и дырок {% hole %} для зрителя.
+
+    shared() строит контекст общей части и вызывается только при
+    промахе: оболочка кэшируется на версию лент страницы, одна для всех
+    пользователей. context (словарь или функция, вызывается раньше
+    shared) нужен и оболочке, и дыркам. При промахе оба читаются
+    с основной базы.
+    """
+    key = shell_key(request)
+    shell = cache.get(key) if key else None
+    if shell is None:
+        with replicas.primary():
+            context = resolve(context)
+            shell = render_to_string(
+                template_name, {**shared(), **context, SHELL: True},
+                request)
+        if key:
+            cache.set(key, shell, settings.FEED_CACHE_TTL)
+    else:
+        context = resolve(context)
+    return HttpResponse(fill(request, shell, context))
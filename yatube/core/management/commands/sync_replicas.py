@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу в локальные реплики SQLite '
+        '(REPLICA_DATABASES) для проверки маршрутизации чтения'
+    )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('REPLICA_DATABASES is not set')
+        for alias in settings.DATABASE_REPLICAS:
+            try:
+                replicas.sync(alias)
+            except ValueError as error:
+                raise CommandError(error)
+            self.stdout.write(f'{alias}: скопирована')
+        self.stdout.write(self.style.SUCCESS('Реплики обновлены'))
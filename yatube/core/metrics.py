@@ -0,0 +1,320 @@
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.template.backends import django as django_backend
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Label for requests no URL pattern matched
+UNRESOLVED = 'unresolved'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Series of exited workers, so that totals never go down
+RETIRED_FILE = 'metrics-retired.json'
+LOCK_FILE = 'metrics.lock'
+
+_lock = threading.Lock()
+_request = threading.local()
+_last_flush = 0.0
+_dirty = False
+# (pid, token) of the process the token and the flusher belong to
+_process = None
+
+
+class Histogram:
+    """
+    Гистограмма Prometheus с одной меткой view.
+
+    Ряд хранит число наблюдений в каждом интервале (последний - +Inf)
+    и сумму; накопленные значения le считаются при выводе.
+    """
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.series = {}
+
+    def new_row(self):
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, view, value):
+        row = self.series.get(view)
+        if row is None:
+            row = self.series[view] = self.new_row()
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+
+class Counter:
+    """Счетчик Prometheus с одной меткой label."""
+
+    def __init__(self, name, documentation, label):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.series = {}
+
+    def inc(self, value, amount=1):
+        with _lock:
+            row = self.series.setdefault(value, [0])
+            row[0] += amount
+
+    def value(self, value):
+        return self.series.get(value, [0])[0]
+
+
+REQUEST_DURATION = Histogram(
+    'yatube_request_duration_seconds', 'Request latency.', LATENCY_BUCKETS)
+DB_QUERIES = Histogram(
+    'yatube_db_queries', 'Database queries per request.', QUERY_BUCKETS)
+DB_DURATION = Histogram(
+    'yatube_db_duration_seconds', 'Time spent in the database per request.',
+    LATENCY_BUCKETS)
+RENDER_DURATION = Histogram(
+    'yatube_template_render_seconds', 'Template render time per request.',
+    LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram(
+    'yatube_response_size_bytes', 'Response body size.', SIZE_BUCKETS)
+HISTOGRAMS = (
+    REQUEST_DURATION, DB_QUERIES, DB_DURATION, RENDER_DURATION, RESPONSE_SIZE)
+LOOKUP_HITS = Counter(
+    'yatube_lookup_cache_hits_total', 'In-process lookup cache hits.',
+    'cache')
+LOOKUP_MISSES = Counter(
+    'yatube_lookup_cache_misses_total', 'In-process lookup cache misses.',
+    'cache')
+COUNTERS = (LOOKUP_HITS, LOOKUP_MISSES)
+
+
+class QueryTimer:
+    """execute_wrapper: число и суммарное время запросов к базе."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            if getattr(_request, 'render', None) is not None:
+                _request.render += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Стандартный движок шаблонов, засекающий время рендеринга."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return Template(template.template, self)
+
+
+def start_request():
+    _request.render = 0.0
+
+
+def finish_request():
+    """Время рендеринга шаблонов с начала запроса."""
+    render, _request.render = _request.render, None
+    return render
+
+
+def observe(view, duration, queries, render, size=None):
+    global _dirty, _last_flush
+    with _lock:
+        REQUEST_DURATION.observe(view, duration)
+        DB_QUERIES.observe(view, queries.count)
+        DB_DURATION.observe(view, queries.duration)
+        RENDER_DURATION.observe(view, render)
+        if size is not None:
+            RESPONSE_SIZE.observe(view, size)
+        _dirty = True
+    if not settings.METRICS_DIR:
+        return
+    process_token()
+    now = time.monotonic()
+    if now - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+        _last_flush = now
+        flush()
+
+
+def snapshot():
+    with _lock:
+        return {
+            metric.name: {
+                label: list(row) for label, row in metric.series.items()
+            }
+            for metric in HISTOGRAMS + COUNTERS
+        }
+
+
+def process_token():
+    """pid и время старта процесса; первый вызов запускает запись."""
+    # A restarted worker may reuse a pid, but never the pair
+    global _process
+    pid = os.getpid()
+    with _lock:
+        if _process is not None and _process[0] == pid:
+            return _process[1]
+        # Forked workers inherit the parent's token: start their own
+        _process = (pid, f'{pid}-{time.time_ns()}')
+    threading.Thread(
+        target=flush_periodically, name='metrics-flush', daemon=True
+    ).start()
+    atexit.register(retire)
+    return _process[1]
+
+
+def process_file():
+    return os.path.join(
+        settings.METRICS_DIR, f'metrics-{process_token()}.json')
+
+
+def write_json(path, data):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    # The scraper never reads a half-written file
+    os.replace(temporary, path)
+
+
+def flush():
+    """Сохраняет ряды процесса в METRICS_DIR для сборки по воркерам."""
+    global _dirty
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    with _lock:
+        _dirty = False
+    write_json(process_file(), snapshot())
+
+
+def flush_periodically():
+    # Requests flush at most once per interval: the last ones before
+    # an idle period are saved here
+    pid = os.getpid()
+    while _process is not None and _process[0] == pid:
+        time.sleep(settings.METRICS_FLUSH_INTERVAL)
+        if _dirty and settings.METRICS_DIR:
+            flush()
+
+
+def directory_lock(shared=False):
+    """Блокировка METRICS_DIR: перенос рядов в RETIRED_FILE атомарен."""
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    file = open(os.path.join(settings.METRICS_DIR, LOCK_FILE), 'a')
+    fcntl.flock(file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+    return file
+
+
+def retire():
+    """При выходе процесса переносит его ряды в RETIRED_FILE."""
+    if not settings.METRICS_DIR or _process is None:
+        return
+    if _process[0] != os.getpid():
+        return
+    path = os.path.join(settings.METRICS_DIR, RETIRED_FILE)
+    with directory_lock():
+        try:
+            with open(path, encoding='utf-8') as file:
+                total = json.load(file)
+        except (OSError, ValueError):
+            total = {}
+        write_json(path, merge(total, snapshot()))
+        try:
+            os.remove(process_file())
+        except FileNotFoundError:
+            pass
+
+
+def merge(total, data):
+    for name, series in data.items():
+        target = total.setdefault(name, {})
+        for view, row in series.items():
+            if view in target:
+                target[view] = [a + b for a, b in zip(target[view], row)]
+            else:
+                target[view] = list(row)
+    return total
+
+
+def collect():
+    """Ряды текущего процесса и сохраненные ряды остальных воркеров."""
+    total = snapshot()
+    if not settings.METRICS_DIR or not os.path.isdir(settings.METRICS_DIR):
+        return total
+    own = os.path.basename(process_file())
+    # An exiting worker is counted either in its file or in RETIRED_FILE
+    with directory_lock(shared=True):
+        for entry in sorted(os.listdir(settings.METRICS_DIR)):
+            if entry == own or not entry.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(settings.METRICS_DIR, entry),
+                          encoding='utf-8') as file:
+                    merge(total, json.load(file))
+            except (OSError, ValueError):
+                continue
+    return total
+
+
+def escape(value):
+    return (value.replace('\\', r'\\').replace('\n', r'\n')
+            .replace('"', r'\"'))
+
+
+def number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition(data):
+    """Текстовый формат Prometheus для собранных рядов."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.append(f'# HELP {histogram.name} {histogram.documentation}')
+        lines.append(f'# TYPE {histogram.name} histogram')
+        bounds = [number(float(bound)) for bound in histogram.buckets]
+        bounds.append('+Inf')
+        for view, row in sorted(data.get(histogram.name, {}).items()):
+            label = f'view="{escape(view)}"'
+            cumulative = 0
+            for bound, observed in zip(bounds, row):
+                cumulative += observed
+                lines.append(
+                    f'{histogram.name}_bucket{{{label},le="{bound}"}} '
+                    f'{cumulative}')
+            lines.append(f'{histogram.name}_sum{{{label}}} {number(row[-1])}')
+            lines.append(f'{histogram.name}_count{{{label}}} {cumulative}')
+    for counter in COUNTERS:
+        lines.append(f'# HELP {counter.name} {counter.documentation}')
+        lines.append(f'# TYPE {counter.name} counter')
+        for value, row in sorted(data.get(counter.name, {}).items()):
+            label = f'{counter.label}="{escape(value)}"'
+            lines.append(f'{counter.name}{{{label}}} {row[0]}')
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    with _lock:
+        for metric in HISTOGRAMS + COUNTERS:
+            metric.series.clear()
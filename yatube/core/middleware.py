@@ -0,0 +1,112 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, page_cache, replicas, slow_queries
+
+
+class MetricsMiddleware:
+    """
+    Замеряет каждый запрос для /metrics: время ответа, запросы к базе,
+    рендеринг шаблонов и размер ответа по имени URL.
+
+    Должен стоять первым, чтобы учитывать остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = metrics.QueryTimer()
+        metrics.start_request()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(queries))
+                response = self.get_response(request)
+        finally:
+            render = metrics.finish_request()
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        size = None
+        if not response.streaming:
+            size = len(response.content)
+        metrics.observe(
+            match.view_name if match else metrics.UNRESOLVED,
+            duration, queries, render, size,
+        )
+        return response
+
+
+class SlowQueryMiddleware:
+    """Запоминает текущий запрос: журнал медленных запросов пишет view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        slow_queries.start_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            slow_queries.finish_request()
+
+
+class ReplicaPinMiddleware:
+    """
+    Читать свои записи: после записи клиент REPLICA_PIN_SECONDS читает
+    с основной базы, пока реплики догоняют. Срок хранится в cookie.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned_until = float(
+                request.COOKIES.get(settings.REPLICA_PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0.0
+        replicas.start_request(pinned_until)
+        try:
+            response = self.get_response(request)
+            if replicas.wrote() and settings.DATABASE_REPLICAS:
+                response.set_cookie(
+                    settings.REPLICA_PIN_COOKIE,
+                    str(time.time() + settings.REPLICA_PIN_SECONDS),
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                )
+            return response
+        finally:
+            replicas.unpin()
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Готовые страницы PAGE_CACHE_VIEWS для посетителей без сессии.
+
+    Стоит перед сессиями и авторизацией: попадание в кэш обходится
+    без них, базы и шаблонов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        match = page_cache.cacheable_view(request)
+        if match is None:
+            return self.get_response(request)
+        response = page_cache.get(request)
+        if response is not None:
+            # Metrics label hits with the page they served
+            request.resolver_match = match
+            return response
+        # The page is stored under current feed versions
+        with replicas.primary():
+            response = self.get_response(request)
+        page_cache.store(request, response)
+        return response
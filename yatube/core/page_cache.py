@@ -0,0 +1,62 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response
+
+HEADER = 'X-Page-Cache'
+
+
+def cache_key(request):
+    url = request.build_absolute_uri()
+    return f'page:{hashlib.md5(url.encode()).hexdigest()}'
+
+
+def cacheable_view(request):
+    """resolver_match страницы из PAGE_CACHE_VIEWS или None."""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    # Visitors with a session may be logged in or have messages pending
+    for cookie in (settings.SESSION_COOKIE_NAME, CookieStorage.cookie_name):
+        if cookie in request.COOKIES:
+            return None
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return None
+    if match.view_name not in settings.PAGE_CACHE_VIEWS:
+        return None
+    return match
+
+
+def get(request):
+    """
+    Сохраненный ответ, если версии всех его лент не изменились.
+
+    Записи меняют версии сигналами, поэтому устаревают ровно страницы
+    затронутых лент, а TTL может быть долгим.
+    """
+    entry = cache.get(cache_key(request))
+    if entry is None:
+        return None
+    versions, response = entry
+    if versions and cache.get_many(list(versions)) != versions:
+        return None
+    response[HEADER] = 'hit'
+    return get_conditional_response(
+        request, etag=response.get('ETag'), response=response)
+
+
+def store(request, response):
+    if (response.status_code != 200 or response.streaming
+            or response.cookies
+            or 'private' in response.get('Cache-Control', '')
+            or request.method != 'GET'):
+        return
+    response[HEADER] = 'miss'
+    # Set by views from the feeds their ETag was built from
+    versions = getattr(request, 'cache_versions', {})
+    cache.set(cache_key(request), (versions, response),
+              settings.PAGE_CACHE_TTL)
@@ -0,0 +1,102 @@
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+def start_request(pinned_until=0.0):
+    """Начало запроса: читать с основной базы, только если клиент
+    недавно писал."""
+    _state.pinned = pinned_until > time.time()
+    _state.wrote = False
+
+
+def pin():
+    _state.pinned = True
+
+
+def unpin():
+    _state.pinned = False
+    _state.wrote = False
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+@contextmanager
+def primary():
+    """
+    Чтение с основной базы внутри блока.
+
+    Для всего, что кладется в кэш под версией ленты: сигнал меняет
+    версию сразу, а отставшая реплика иначе сохранила бы под новым
+    ключом старые строки до следующей записи в ленту.
+    """
+    pinned = is_pinned()
+    pin()
+    try:
+        yield
+    finally:
+        _state.pinned = pinned or wrote()
+
+
+def wrote():
+    """Была ли запись с начала запроса."""
+    return getattr(_state, 'wrote', False)
+
+
+class ReplicaRouter:
+    """
+    Чтение - со случайной реплики DATABASE_REPLICAS, запись - в default.
+
+    После записи поток до конца запроса читает с default; между
+    запросами клиента закрепляет ReplicaPinMiddleware. Внутри транзакции
+    default все читается из нее же, внутри primary() - тоже.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_pinned():
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        pin()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def sync(alias):
+    """Копирует default в локальную реплику SQLite через backup API."""
+    primary = connections[DEFAULT_DB_ALIAS]
+    replica = connections[alias]
+    if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+        raise ValueError('Only SQLite replicas can be copied')
+    replica.close()
+    primary.ensure_connection()
+    target = sqlite3.connect(replica.settings_dict['NAME'])
+    try:
+        primary.connection.backup(target)
+    finally:
+        target.close()
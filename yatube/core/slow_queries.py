@@ -0,0 +1,120 @@
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Statements worth a query plan; savepoints and pragmas have none
+EXPLAINED = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+SPACES = re.compile(r'\s+')
+
+_local = threading.local()
+_lock = threading.Lock()
+# pattern -> [monotonic time of the last record, suppressed since]
+_reported = {}
+
+
+def pattern(sql):
+    """SQL без различий в длине IN-списков: ключ для ограничения частоты."""
+    return IN_LIST.sub('IN (...)', SPACES.sub(' ', sql.strip()))
+
+
+def should_log(key):
+    """Первая запись шаблона за интервал; вернет число пропущенных."""
+    now = time.monotonic()
+    with _lock:
+        last = _reported.get(key)
+        if last is not None and (
+                now - last[0] < settings.SLOW_QUERY_LOG_INTERVAL):
+            last[1] += 1
+            return None
+        _reported[key] = [now, 0]
+        return last[1] if last else 0
+
+
+def caller():
+    """Ближайший кадр кода проекта, из которого выполнен запрос."""
+    for frame, line in traceback.walk_stack(None):
+        filename = frame.f_code.co_filename
+        if (filename.startswith(settings.BASE_DIR)
+                and filename != __file__
+                and os.sep + 'site-packages' + os.sep not in filename):
+            return f'{filename}:{line} in {frame.f_code.co_name}'
+    return 'unknown'
+
+
+def current_view():
+    request = getattr(_local, 'request', None)
+    if request is None:
+        return None
+    match = request.resolver_match
+    return match.view_name if match else request.path
+
+
+def explain(connection, sql, params):
+    if not sql.lstrip().upper().startswith(EXPLAINED):
+        return ''
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{connection.ops.explain_query_prefix()} {sql}', params)
+            # The plan text is the last column on every backend
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+    except DatabaseError as error:
+        return f'unavailable: {error}'
+    finally:
+        _local.explaining = False
+
+
+def log_slow_query(execute, sql, params, many, context):
+    """
+    execute_wrapper: запросы дольше SLOW_QUERY_MS пишет в лог вместе с
+    параметрами, view, местом вызова и планом запроса.
+    """
+    threshold = settings.SLOW_QUERY_MS
+    if threshold is None or getattr(_local, 'explaining', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = (time.perf_counter() - started) * 1000
+    if duration < threshold:
+        return result
+    suppressed = should_log(pattern(sql))
+    if suppressed is None:
+        return result
+    plan = '' if many else explain(context['connection'], sql, params)
+    logger.warning(
+        'Slow query %.1f ms in %s at %s (%d similar suppressed)\n'
+        '%s\nparams: %r\nplan:\n%s',
+        duration, current_view() or 'no request', caller(), suppressed,
+        sql, params, plan,
+    )
+    return result
+
+
+def install(sender, connection, **kwargs):
+    """connection_created: подключает журнал ко всем соединениям."""
+    if log_slow_query not in connection.execute_wrappers:
+        # execute_wrapper() pops the last wrapper: stay below theirs
+        connection.execute_wrappers.insert(0, log_slow_query)
+
+
+def start_request(request):
+    _local.request = request
+
+
+def finish_request():
+    _local.request = None
+
+
+def reset():
+    with _lock:
+        _reported.clear()
@@ -0,0 +1,19 @@
+from django import template
+
+from core import donut
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name):
+    """
+    Часть страницы, своя для каждого зрителя.
+
+    В оболочке donut.render оставляет метку и отрисовывается при ответе,
+    в остальных страницах работает как {% include %}.
+    """
+    if context.get(donut.SHELL):
+        return donut.marker(template_name)
+    included = context.template.engine.get_template(template_name)
+    return included.render(context)
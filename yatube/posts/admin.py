@@ -1,14 +1,53 @@
+from functools import reduce
+from operator import or_
+
 from django.contrib import admin
 from django.conf import settings
+from django.db.models import Q
 
+from . import fulltext
 from .models import Comment, Follow, Group, Post
 
 
+class FullTextSearchMixin:
+    """
+    Поиск в админке по FTS5-индексу вместо LIKE '%...%'.
+
+    Поля search_indexed_fields ищутся по индексу, остальные поля
+    search_fields - как обычно; совпадения объединяются через OR.
+    """
+    search_index = None
+    search_indexed_fields = ('text',)
+
+    def get_search_results(self, request, queryset, search_term):
+        match = fulltext.match_expression(search_term)
+        if not match or not fulltext.fts_available(queryset.db):
+            return super().get_search_results(
+                request, queryset, search_term)
+        indexed = fulltext.filter_indexed(
+            self.model._default_manager.all(), self.search_index, match)
+        condition = Q(pk__in=indexed.values('pk'))
+        others = [
+            field for field in self.get_search_fields(request)
+            if field not in self.search_indexed_fields
+        ]
+        if others:
+            words = Q()
+            for word in search_term.split():
+                words &= reduce(or_, (
+                    Q(**{f'{field}__icontains': word}) for field in others
+                ))
+            condition |= words
+        # Related lookups may join several rows per object
+        return queryset.filter(condition), bool(others)
+
+
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
     list_editable = ('group',)
     search_fields = ('text',)
+    search_index = 'posts_post_fts'
     list_filter = ('pub_date',)
     empty_value_display = settings.EMPTY_VALUE_DISPLAY
 
@@ -23,10 +62,11 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'author', 'created', 'post')
     list_editable = ('text',)
-    search_fields = ('author', 'text')
+    search_fields = ('author__username', 'text')
+    search_index = 'posts_comment_fts'
     list_filter = ('created',)
     empty_value_display = settings.EMPTY_VALUE_DISPLAY
 
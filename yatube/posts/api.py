@@ -0,0 +1,199 @@
+from functools import wraps
+
+from django.http import JsonResponse
+from django.views.decorators.http import condition, require_GET
+
+from . import etags, timeline
+from .models import Comment, Group, Post, User, post_storage
+from .pagination import (COMMENT_ORDERING, FEED_ORDERING, POSTS_PER_PAGE,
+                         CursorPaginator, InvalidCursor)
+
+# Output name -> values() lookup: rows are serialized without models
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+PROFILE_FIELDS = {
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'posts_count': 'profile__posts_count',
+    'followers_count': 'profile__followers_count',
+    'following_count': 'profile__following_count',
+}
+FILE_FIELDS = {'image'}
+
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+class InvalidFields(Exception):
+    pass
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def error(detail, status):
+    return json_response({'detail': detail}, status=status)
+
+
+def login_required(view):
+    """Как django login_required, но 401 вместо редиректа на вход."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error('Authentication required', 401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def requested_fields(request, available):
+    """Поля из ?fields=id,text,author; без параметра - все поля."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown or not fields:
+        raise InvalidFields(', '.join(unknown))
+    return fields
+
+
+def serialize(rows, fields, available):
+    result = []
+    for row in rows:
+        item = {}
+        for name in fields:
+            value = row[available[name]]
+            if name in FILE_FIELDS:
+                value = post_storage.url(value) if value else None
+            item[name] = value
+        result.append(item)
+    return result
+
+
+def page_link(request, param, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    query[param] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def paginated(request, queryset, available, ordering=FEED_ORDERING,
+              parent=None):
+    """
+    JSON-страница queryset с курсорами next/previous.
+
+    parent - queryset владельца ленты: проверяется, только если
+    страница пуста, чтобы отличить пустую ленту от 404.
+    """
+    try:
+        fields = requested_fields(request, available)
+    except InvalidFields as unknown:
+        return error(f'Unknown fields: {unknown}', 400)
+    # Cursor columns are selected even when not requested
+    columns = {available[name] for name in fields}
+    columns.update(field.lstrip('-') for field in ordering)
+    paginator = CursorPaginator(
+        queryset.values(*columns), POSTS_PER_PAGE, ordering)
+    try:
+        page = paginator.page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    except InvalidCursor:
+        return error('Invalid cursor', 400)
+    if not page and parent is not None and not parent.exists():
+        return error('Not found', 404)
+    return json_response({
+        'results': serialize(page, fields, available),
+        'next': page_link(request, 'after', page.next_cursor),
+        'previous': page_link(request, 'before', page.previous_cursor),
+    })
+
+
+def single(request, queryset, available):
+    try:
+        fields = requested_fields(request, available)
+    except InvalidFields as unknown:
+        return error(f'Unknown fields: {unknown}', 400)
+    rows = queryset.values(*{available[name] for name in fields})[:1]
+    if not rows:
+        return error('Not found', 404)
+    return json_response(serialize(rows, fields, available)[0])
+
+
+@require_GET
+@condition(etag_func=etags.api_index)
+def index(request):
+    return paginated(request, Post.objects.all(), POST_FIELDS)
+
+
+@require_GET
+@condition(etag_func=etags.api_group_posts)
+def group_posts(request, slug):
+    return paginated(
+        request,
+        Post.objects.filter(group__slug=slug),
+        POST_FIELDS,
+        parent=Group.objects.filter(slug=slug),
+    )
+
+
+@require_GET
+@condition(etag_func=etags.profile)
+def profile(request, username):
+    return single(
+        request, User.objects.filter(username=username), PROFILE_FIELDS)
+
+
+@require_GET
+@condition(etag_func=etags.api_profile_posts)
+def profile_posts(request, username):
+    return paginated(
+        request,
+        Post.objects.filter(author__username=username),
+        POST_FIELDS,
+        parent=User.objects.filter(username=username),
+    )
+
+
+@require_GET
+@condition(etag_func=etags.post_detail)
+def post_detail(request, post_id):
+    return single(request, Post.objects.filter(pk=post_id), POST_FIELDS)
+
+
+@require_GET
+@condition(etag_func=etags.post_detail)
+def post_comments(request, post_id):
+    return paginated(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        COMMENT_FIELDS,
+        COMMENT_ORDERING,
+        parent=Post.objects.filter(pk=post_id),
+    )
+
+
+@login_required
+@require_GET
+@condition(etag_func=etags.api_follow_index)
+def follow_index(request):
+    return paginated(request, timeline.posts_for(request.user), POST_FIELDS)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from . import feed_cache, signals  # noqa: F401
+        feed_cache.check_shared_cache()
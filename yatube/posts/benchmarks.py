@@ -0,0 +1,275 @@
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from http.cookies import SimpleCookie
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.db import connection, reset_queries
+from django.db.models import Count
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from . import lookups
+from .models import Comment, Group, Post, User
+from .seed import Seeder
+
+# Dataset sizes per scale, passed to Seeder.run
+SCALES = {
+    '1k': {'users': 100, 'groups': 10, 'posts': 1000,
+           'comments': 2000, 'follows': 500},
+    '100k': {'users': 5000, 'groups': 50, 'posts': 100000,
+             'comments': 200000, 'follows': 20000},
+    '1m': {'users': 50000, 'groups': 200, 'posts': 1000000,
+           'comments': 2000000, 'follows': 200000},
+}
+VIEWS = (
+    'index', 'group_list', 'profile', 'post_detail', 'follow_index',
+    'add_comment', 'post_create',
+)
+BENCHMARK_TEXT = 'Benchmark'
+# Suffix of results measured with warm caches
+WARM = ':warm'
+# Relative slowdown of the median reported as a regression
+THRESHOLD = 1.25
+
+
+def use_database(path):
+    """Переключает default на файл path, создает схему при первом запуске."""
+    connection.close()
+    connection.settings_dict['NAME'] = path
+    call_command('migrate', verbosity=0, interactive=False)
+
+
+def ensure_dataset(scale, seed=0):
+    """Генерирует набор данных масштаба scale, если база еще пуста."""
+    if Post.objects.exists():
+        return False
+    Seeder(seed=seed).run(**SCALES[scale])
+    return True
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def csrf_pair():
+    """(токен для X-CSRFToken, значение cookie CSRF) для запросов."""
+    request = HttpRequest()
+    token = get_token(request)
+    return token, request.META['CSRF_COOKIE']
+
+
+def cookie_header(user, csrf_cookie):
+    """Заголовок Cookie с сессией вошедшего user и cookie CSRF."""
+    client = Client()
+    client.force_login(user)
+    cookies = SimpleCookie()
+    cookies.update(client.cookies)
+    cookies[settings.CSRF_COOKIE_NAME] = csrf_cookie
+    return '; '.join(
+        f'{morsel.key}={morsel.value}' for morsel in cookies.values())
+
+
+def wsgi_environ(factory, method, url, data, cookies, csrf_token):
+    return getattr(factory, method)(
+        url, data or {},
+        HTTP_COOKIE=cookies,
+        HTTP_X_CSRFTOKEN=csrf_token,
+    ).environ
+
+
+def call_wsgi(application, environ):
+    """Проводит запрос через WSGI-приложение, возвращает (статус, тело)."""
+    status = []
+    response = application(
+        environ,
+        lambda code, headers, exc_info=None: status.append(code),
+    )
+    try:
+        body = b''.join(response)
+    finally:
+        response.close()
+    return status[0], body
+
+
+def delete_generated(text):
+    """Удаляет комментарии и посты прогона с текстом text."""
+    # Through the ORM: signals keep counters and timelines in sync
+    for comment in Comment.objects.filter(text=text):
+        comment.delete()
+    for post in Post.objects.filter(text=text):
+        post.delete()
+
+
+class ViewBenchmark:
+    """
+    Прогон представлений через WSGIHandler, как в продакшене.
+
+    Запросы строятся RequestFactory, но проходят весь стек middleware;
+    авторизация и CSRF - настоящими cookie. Каждый запрос идет
+    с пустыми кэшами; с warm каждое view замеряется еще и с прогретыми,
+    под именем с суффиксом WARM.
+    """
+
+    def __init__(self, repeat=30, warmup=3, warm=False):
+        self.repeat = repeat
+        self.warmup = warmup
+        self.warm = warm
+        self.handler = WSGIHandler()
+        self.factory = RequestFactory()
+        self.prepare()
+
+    def prepare(self):
+        # Busiest objects: the slowest realistic pages
+        self.reader = (
+            User.objects.annotate(total=Count('follower'))
+            .order_by('-total', 'pk').first()
+        )
+        author_id = (
+            Post.objects.order_by().values('author')
+            .annotate(total=Count('pk')).order_by('-total')
+            .values_list('author', flat=True).first()
+        )
+        self.author = User.objects.get(pk=author_id)
+        self.group = (
+            Group.objects.order_by('-posts_count', 'pk').first())
+        self.post = Post.objects.order_by('-comments_count', 'pk').first()
+        self.csrf_token, csrf_cookie = csrf_pair()
+        self.cookie_header = cookie_header(self.reader, csrf_cookie)
+
+    def requests(self):
+        """{имя: (метод, url, данные)} для каждого замеряемого view."""
+        post_kwargs = {'post_id': self.post.pk}
+        return {
+            'index': ('get', reverse('posts:index'), None),
+            'group_list': ('get', reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}), None),
+            'profile': ('get', reverse(
+                'posts:profile', kwargs={'username': self.author.username}),
+                None),
+            'post_detail': ('get', reverse(
+                'posts:post_detail', kwargs=post_kwargs), None),
+            'follow_index': ('get', reverse('posts:follow_index'), None),
+            'add_comment': ('post', reverse(
+                'posts:add_comment', kwargs=post_kwargs),
+                {'text': BENCHMARK_TEXT}),
+            'post_create': ('post', reverse('posts:post_create'),
+                            {'text': BENCHMARK_TEXT}),
+        }
+
+    def environ(self, method, url, data):
+        return wsgi_environ(
+            self.factory, method, url, data,
+            self.cookie_header, self.csrf_token)
+
+    def call(self, environ, cold):
+        if cold:
+            cache.clear()
+            lookups.clear()
+        status, body = call_wsgi(self.handler, environ)
+        if not status.startswith(('200', '302')):
+            raise RuntimeError(f'{environ["PATH_INFO"]}: {status}')
+        return body
+
+    def measure(self, method, url, data, cold=True):
+        timings = []
+        for attempt in range(self.warmup + self.repeat):
+            # wsgi.input is a stream: every call needs a fresh environ
+            environ = self.environ(method, url, data)
+            started = time.perf_counter()
+            self.call(environ, cold)
+            if attempt >= self.warmup:
+                timings.append((time.perf_counter() - started) * 1000)
+        # request_started resets the query log: start the capture from zero
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            self.call(self.environ(method, url, data), cold)
+        # The next request clears the log the capture reads from
+        query_count = len(queries)
+        tracemalloc.start()
+        try:
+            self.call(self.environ(method, url, data), cold)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'queries': query_count,
+            'peak_alloc_kib': round(peak / 1024, 1),
+        }
+
+    def run(self, views=VIEWS):
+        results = {}
+        requests = self.requests()
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+            try:
+                for name in views:
+                    results[name] = self.measure(*requests[name])
+                    if self.warm:
+                        results[name + WARM] = self.measure(
+                            *requests[name], cold=False)
+            finally:
+                self.cleanup()
+        return results
+
+    def cleanup(self):
+        delete_generated(BENCHMARK_TEXT)
+
+
+def report(scale, results, repeat):
+    return {
+        'scale': scale,
+        'dataset': SCALES[scale],
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Регрессии относительно baseline: медиана выросла больше чем в
+    threshold раз или стало больше SQL-запросов.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        if current['median_ms'] > previous['median_ms'] * threshold:
+            regressions.append(
+                f'{name}: median {previous["median_ms"]} -> '
+                f'{current["median_ms"]} ms')
+        if current['queries'] > previous['queries']:
+            regressions.append(
+                f'{name}: queries {previous["queries"]} -> '
+                f'{current["queries"]}')
+    return regressions
+
+
+def load(path):
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save(path, data):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, indent=2)
+        file.write('\n')
@@ -0,0 +1,61 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Profile
+
+from .models import Comment, Follow, Group, Post, User
+
+
+def change(queryset, delta, *fields):
+    """Атомарно сдвигает счетчики на delta через F()-выражения."""
+    if delta < 0:
+        # Drifted counter must not break the write with a CHECK violation
+        queryset = queryset.filter(
+            **{f'{field}__gte': -delta for field in fields})
+    queryset.update(**{field: F(field) + delta for field in fields})
+
+
+def change_group(group_id, delta):
+    if group_id is not None:
+        change(Group.objects.filter(pk=group_id), delta, 'posts_count')
+
+
+def change_profile(user_id, delta, *fields):
+    change(Profile.objects.filter(user_id=user_id), delta, *fields)
+
+
+def change_post(post_id, delta):
+    change(Post.objects.filter(pk=post_id), delta, 'comments_count')
+
+
+def count_of(queryset, field, outer='pk'):
+    """Подзапрос COUNT(*) по внешнему ключу field для OuterRef(outer)."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef(outer)})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def recount():
+    """Пересчитывает все денормализованные счетчики с нуля."""
+    Profile.objects.bulk_create(
+        Profile(user_id=pk)
+        for pk in User.objects.filter(
+            profile__isnull=True).values_list('pk', flat=True)
+    )
+    return {
+        'profiles': Profile.objects.update(
+            posts_count=count_of(Post.objects, 'author', 'user_id'),
+            followers_count=count_of(Follow.objects, 'author', 'user_id'),
+            following_count=count_of(Follow.objects, 'user', 'user_id'),
+        ),
+        'groups': Group.objects.update(
+            posts_count=count_of(Post.objects, 'group'),
+        ),
+        'posts': Post.objects.update(
+            comments_count=count_of(Comment.objects, 'post'),
+        ),
+    }
@@ -0,0 +1,95 @@
+import hashlib
+from functools import wraps
+
+from . import feed_cache, lookups
+from .models import Post
+
+
+def make_etag(request, *feeds):
+    """
+    ETag страницы из версий ее лент, параметров запроса и зрителя.
+
+    Версии лент меняются сигналами при любой правке их постов,
+    поэтому совпадение ETag означает, что страница не изменилась.
+    """
+    viewer = request.user.pk if request.user.is_authenticated else 0
+    versions = feed_cache.get_versions(*feeds)
+    # The anonymous page cache checks the same versions on every hit
+    request.cache_versions = {
+        feed_cache.version_key(feed, scope): version
+        for (feed, scope), version in zip(feeds, versions)
+    }
+    parts = [
+        f'{feed}:{scope}@{version}'
+        for (feed, scope), version in zip(feeds, versions)
+    ]
+    parts += [request.GET.urlencode(), f'user:{viewer}']
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def index(request):
+    return make_etag(request, (feed_cache.INDEX, None))
+
+
+def group_posts(request, slug):
+    group = lookups.group(slug)
+    if group is None:
+        # Let the view answer 404
+        return None
+    return make_etag(request, (feed_cache.GROUP, group.pk))
+
+
+def profile(request, username):
+    author = lookups.user(username)
+    if author is None:
+        return None
+    return make_etag(request, (feed_cache.PROFILE, author.pk))
+
+
+def follow_index(request):
+    return make_etag(
+        request,
+        (feed_cache.INDEX, None),
+        (feed_cache.FOLLOW, request.user.pk),
+    )
+
+
+def post_detail(request, post_id):
+    post = Post.objects.filter(
+        pk=post_id).values('author_id', 'group_id').first()
+    if post is None:
+        return None
+    # The page also shows author's post count and group title
+    feeds = [
+        (feed_cache.POST, post_id),
+        (feed_cache.PROFILE, post['author_id']),
+    ]
+    if post['group_id'] is not None:
+        feeds.append((feed_cache.GROUP, post['group_id']))
+    return make_etag(request, *feeds)
+
+
+def post_comments(request, post_id):
+    # New and deleted comments bump the post version
+    return make_etag(request, (feed_cache.POST, post_id))
+
+
+def with_comments(etag_func):
+    """
+    ETag списка API: в нем есть comments_count, а комментарии меняют
+    версию поста, не версии лент.
+    """
+    @wraps(etag_func)
+    def wrapper(request, *args, **kwargs):
+        etag = etag_func(request, *args, **kwargs)
+        if etag is None:
+            return None
+        version, = feed_cache.get_versions((feed_cache.COMMENTS, None))
+        return hashlib.md5(f'{etag}|comments@{version}'.encode()).hexdigest()
+    return wrapper
+
+
+api_index = with_comments(index)
+api_group_posts = with_comments(group_posts)
+api_profile_posts = with_comments(profile)
+api_follow_index = with_comments(follow_index)
@@ -0,0 +1,92 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+# Backends private to one process: a bump would not reach other workers
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+INDEX = 'index'
+GROUP = 'group'
+PROFILE = 'profile'
+FOLLOW = 'follow'
+POST = 'post'
+# Any comment: only for ETags of lists that show comments_count
+COMMENTS = 'comments'
+
+
+def check_shared_cache():
+    """Версии лент должны быть общими для всех воркеров WEB_CONCURRENCY."""
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.WEB_CONCURRENCY > 1 and backend in PROCESS_LOCAL_BACKENDS:
+        raise ImproperlyConfigured(
+            f'{backend} keeps feed versions per process, '
+            f'{settings.WEB_CONCURRENCY} workers would serve stale pages. '
+            'Configure a shared cache backend.'
+        )
+
+
+def version_key(feed, scope=None):
+    if scope is None:
+        return f'feed-version:{feed}'
+    return f'feed-version:{feed}:{scope}'
+
+
+def _initial_version():
+    # Evicted counter must not restart from an already used value
+    return int(time.time() * 1000)
+
+
+def bump(*feeds):
+    """Инвалидирует кэш ленты: feeds - пары (лента, scope)."""
+    for feed, scope in feeds:
+        key = version_key(feed, scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def get_versions(*feeds):
+    keys = [version_key(feed, scope) for feed, scope in feeds]
+    versions = cache.get_many(keys)
+    missing = {
+        key: _initial_version() for key in keys if key not in versions
+    }
+    for key, version in missing.items():
+        # add() keeps the value of a concurrent writer
+        if not cache.add(key, version, None):
+            missing[key] = cache.get(key, version)
+    versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def page_marker(request):
+    """Часть ключа, различающая страницы ленты (номер или курсор)."""
+    return ':'.join(
+        request.GET.get(param, '') for param in ('page', 'after', 'before')
+    )
+
+
+def fragment_context(request, *feeds):
+    """Контекст для {% cache feed_cache_ttl ... feed_cache_key %}."""
+    parts = [
+        f'{feed}:{scope}@{version}'
+        for (feed, scope), version in zip(feeds, get_versions(*feeds))
+    ]
+    parts.append(page_marker(request))
+    return {
+        'feed_cache_key': '|'.join(parts),
+        'feed_cache_ttl': settings.FEED_CACHE_TTL,
+    }
+
+
+def post_feeds(author_id, *group_ids):
+    """Ленты, в которых показывается пост."""
+    feeds = [(INDEX, None), (PROFILE, author_id)]
+    feeds += [(GROUP, group_id) for group_id in set(group_ids) if group_id]
+    return feeds
@@ -1,6 +1,7 @@
+from django import forms
 from django.forms import ModelForm
 
-from .models import Comment, Post
+from .models import Comment, Group, Post, User
 
 
 class PostForm(ModelForm):
@@ -22,3 +23,20 @@ class CommentForm(ModelForm):
             'author': 'Автор комментария',
             'text': 'Текст комментария'
         }
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Поиск', max_length=200)
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        label='Группа',
+        to_field_name='slug',
+        required=False,
+    )
+    author = forms.ModelChoiceField(
+        User.objects.all(),
+        label='Автор',
+        to_field_name='username',
+        required=False,
+        widget=forms.TextInput,
+    )
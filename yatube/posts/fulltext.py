@@ -0,0 +1,165 @@
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .models import Post
+
+TOKEN_RE = re.compile(r'\w+')
+
+FTS_TABLES = (
+    ('posts_post_fts', 'posts_post'),
+    ('posts_comment_fts', 'posts_comment'),
+)
+TRIGGERS_SQL = (
+    """CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+        INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+        INSERT INTO {fts}({fts}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF text ON {table}
+    BEGIN
+        INSERT INTO {fts}({fts}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text);
+    END""",
+)
+
+HITS_SQL = """
+    SELECT hits.post_id, MIN(hits.rank) AS rank FROM (
+        SELECT rowid AS post_id, bm25(posts_post_fts) AS rank
+        FROM posts_post_fts
+        WHERE posts_post_fts MATCH %s
+        UNION ALL
+        SELECT comment.post_id, bm25(posts_comment_fts)
+        FROM posts_comment_fts
+        JOIN posts_comment comment ON comment.id = posts_comment_fts.rowid
+        WHERE posts_comment_fts MATCH %s
+    ) hits
+    JOIN posts_post post ON post.id = hits.post_id
+    {where}
+    GROUP BY hits.post_id
+"""
+
+
+def fts_available(using):
+    return connections[using].vendor == 'sqlite'
+
+
+def ensure_index(using='default'):
+    """
+    Восстанавливает триггеры FTS5 и переиндексирует таблицу, если нужно.
+
+    SQLite пересоздает таблицу при многих ALTER в миграциях, и триггеры
+    исходной таблицы при этом пропадают. Вызывается после migrate.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master")
+        existing = set(cursor.fetchall())
+        for fts, table in FTS_TABLES:
+            if ('table', fts) not in existing:
+                continue
+            triggers = {f'{fts}_ai', f'{fts}_ad', f'{fts}_au'}
+            if all(('trigger', name) in existing for name in triggers):
+                continue
+            for statement in TRIGGERS_SQL:
+                cursor.execute(statement.format(fts=fts, table=table))
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def match_expression(query):
+    """Строка запроса FTS5 из слов пользователя: синтаксис FTS экранирован."""
+    return ' '.join(f'"{token}"' for token in TOKEN_RE.findall(query))
+
+
+def filter_indexed(queryset, fts_table, match):
+    """Ограничивает queryset строками, найденными в индексе fts_table."""
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        where=[
+            f'{table}.id IN (SELECT rowid FROM {fts_table} '
+            f'WHERE {fts_table} MATCH %s)'
+        ],
+        params=[match],
+    )
+
+
+class SearchResults:
+    """
+    Посты, найденные по тексту поста или комментариев, по рангу BM25.
+
+    Поддерживает count() и срезы, поэтому подходит для Paginator.
+    Все запросы идут в базу using, выбранную роутером для чтения.
+    """
+
+    def __init__(self, match, using, group=None, author=None):
+        self.match = match
+        self.using = using
+        where, self.filter_params = [], []
+        if group is not None:
+            where.append('post.group_id = %s')
+            self.filter_params.append(group.pk)
+        if author is not None:
+            where.append('post.author_id = %s')
+            self.filter_params.append(author.pk)
+        self.sql = HITS_SQL.format(
+            where=f'WHERE {" AND ".join(where)}' if where else ''
+        )
+
+    @property
+    def params(self):
+        return [self.match, self.match, *self.filter_params]
+
+    @cached_property
+    def total(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM ({self.sql})', self.params)
+            return cursor.fetchone()[0]
+
+    def count(self):
+        return self.total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        offset = key.start or 0
+        limit = -1 if key.stop is None else key.stop - offset
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'{self.sql} ORDER BY rank, hits.post_id DESC '
+                f'LIMIT %s OFFSET %s',
+                [*self.params, limit, offset]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.using(self.using).select_related(
+            'author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def search(query, group=None, author=None):
+    """Полнотекстовый поиск по постам и комментариям."""
+    match = match_expression(query)
+    if not match:
+        return Post.objects.none()
+    # Counts and pages must come from the same database
+    using = router.db_for_read(Post)
+    if fts_available(using):
+        return SearchResults(match, using, group=group, author=author)
+    words = Q()
+    for token in TOKEN_RE.findall(query):
+        words &= Q(text__icontains=token) | Q(comment__text__icontains=token)
+    post_list = Post.objects.filter(words)
+    if group is not None:
+        post_list = post_list.filter(group=group)
+    if author is not None:
+        post_list = post_list.filter(author=author)
+    return post_list.select_related('author', 'group').distinct()
@@ -0,0 +1,102 @@
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.images import get_image_dimensions
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# Metadata some writers copy from image.info (PNG keeps the ICC profile)
+METADATA_KEYS = ('exif', 'icc_profile')
+# Formats kept for the bounded original, anything else is stored as PNG
+ORIGINAL_FORMATS = {
+    'JPEG': '.jpg',
+    'PNG': '.png',
+    'GIF': '.gif',
+    'WEBP': '.webp',
+}
+
+
+def compact_format():
+    """WebP, если Pillow собран с его поддержкой, иначе JPEG."""
+    if features.check('webp'):
+        return 'WEBP', '.webp'
+    return 'JPEG', '.jpg'
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def encode(image, image_format):
+    """Кодирует картинку без EXIF и ICC-профиля."""
+    for key in METADATA_KEYS:
+        image.info.pop(key, None)
+    buffer = BytesIO()
+    options = {}
+    if image_format == 'JPEG':
+        image = image.convert('RGB')
+        options = {
+            'quality': settings.POST_IMAGE_QUALITY,
+            'optimize': True,
+            'progressive': True,
+        }
+    elif image_format == 'WEBP':
+        image = image.convert('RGBA' if has_alpha(image) else 'RGB')
+        options = {'quality': settings.POST_IMAGE_QUALITY, 'method': 4}
+    elif image_format == 'PNG':
+        options = {'optimize': True}
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def normalize(upload):
+    """
+    Возвращает (ограниченный оригинал, сжатая копия) для загруженного файла.
+
+    Оригинал повернут по EXIF, уменьшен до POST_IMAGE_MAX_SIZE и очищен
+    от метаданных. Анимированные и нечитаемые файлы не трогаем: (None, None).
+    """
+    try:
+        upload.seek(0)
+        image = Image.open(upload)
+        image.load()
+    except (OSError, ValueError):
+        logger.warning('Could not normalize image %s', upload.name)
+        return None, None
+    if getattr(image, 'is_animated', False):
+        return None, None
+    original_format = image.format
+    image = ImageOps.exif_transpose(image)
+    max_size = settings.POST_IMAGE_MAX_SIZE
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+    base = os.path.splitext(os.path.basename(upload.name))[0]
+    if original_format not in ORIGINAL_FORMATS:
+        original_format = 'PNG'
+    original = ContentFile(
+        encode(image, original_format),
+        name=base + ORIGINAL_FORMATS[original_format],
+    )
+    image_format, extension = compact_format()
+    compact = ContentFile(
+        encode(image, image_format), name=base + extension)
+    return original, compact
+
+
+def normalize_post_image(post):
+    """
+    Заменяет новую загрузку поста ограниченным оригиналом и копией
+    и запоминает размеры картинки.
+    """
+    original, compact = normalize(post.image.file)
+    if original is not None:
+        post.image = original
+        post.compact_image = compact
+    post.image_width, post.image_height = get_image_dimensions(
+        post.image.file)
@@ -0,0 +1,226 @@
+import logging
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from .benchmarks import (call_wsgi, cookie_header, csrf_pair,
+                         delete_generated, percentile, wsgi_environ)
+from .models import Follow, Post, User
+from .seed import skewed_index
+
+# Scenario weights: what share of actions a visitor spends on each
+SCENARIOS = {
+    'index': 60,
+    'post_detail': 25,
+    'add_comment': 10,
+    'follow': 5,
+}
+LOADTEST_TEXT = 'Loadtest'
+# Posts visitors open: the ones they see on the first pages of the feed
+HOT_POSTS = 100
+OK_STATUSES = ('200', '302', '304')
+
+
+def parse_mix(value):
+    """'index=50,follow=10' -> веса сценариев; пропущенные равны нулю."""
+    mix = dict.fromkeys(SCENARIOS, 0)
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f'Unknown scenario: {name}')
+        mix[name] = int(weight or 1)
+    if not any(mix.values()):
+        raise ValueError('Scenario mix is empty')
+    return mix
+
+
+class VirtualUser:
+    """Авторизованный посетитель: cookie сессии и CSRF, свои подписки."""
+
+    def __init__(self, user, csrf_token, csrf_cookie):
+        self.cookie_header = cookie_header(user, csrf_cookie)
+        self.csrf_token = csrf_token
+        self.user = user
+        self.following = set(Follow.objects.filter(
+            user=user).values_list('author__username', flat=True))
+
+
+class LoadTest:
+    """
+    Смесь сценариев из пула потоков прямо через WSGI-приложение.
+
+    Каждый поток ведет своих посетителей, поэтому их состояние не
+    делится между потоками. Ответы кроме 200, 302 и 304, как и
+    исключения, считаются ошибками: так видны, например, блокировки
+    SQLite при записи.
+    """
+
+    def __init__(self, threads=8, users=32, requests=1000, duration=None,
+                 mix=None, seed=0):
+        # Importing the module creates the application the server runs
+        from yatube.wsgi import application
+        self.application = application
+        self.threads = threads
+        self.requests = requests
+        self.duration = duration
+        self.mix = mix or SCENARIOS
+        self.seed = seed
+        self.prepare(users)
+
+    def prepare(self, users):
+        rng = random.Random(self.seed)
+        user_ids = list(User.objects.order_by('pk').values_list(
+            'pk', flat=True))
+        chosen = rng.sample(user_ids, min(users, len(user_ids)))
+        csrf_token, csrf_cookie = csrf_pair()
+        self.users = [
+            VirtualUser(user, csrf_token, csrf_cookie)
+            for user in User.objects.filter(pk__in=chosen).order_by('pk')
+        ]
+        hot = list(Post.objects.order_by('-pub_date', '-pk').values_list(
+            'pk', 'author__username')[:HOT_POSTS])
+        if not self.users or not hot:
+            raise ValueError('Load test needs users and posts')
+        self.posts = [pk for pk, _ in hot]
+        self.authors = list(dict.fromkeys(author for _, author in hot))
+        self.follows = self.current_follows()
+
+    def current_follows(self):
+        return set(Follow.objects.filter(
+            user__in=[visitor.user for visitor in self.users]
+        ).values_list('user', 'author'))
+
+    def action(self, rng, visitor):
+        """(эндпоинт, метод, url, данные) для следующего шага посетителя."""
+        scenario = rng.choices(
+            list(self.mix), weights=list(self.mix.values()))[0]
+        if scenario == 'index':
+            return scenario, 'get', reverse('posts:index'), None
+        post_kwargs = {
+            'post_id': self.posts[skewed_index(rng, len(self.posts))]}
+        if scenario == 'post_detail':
+            return (scenario, 'get',
+                    reverse('posts:post_detail', kwargs=post_kwargs), None)
+        if scenario == 'add_comment':
+            return (scenario, 'post',
+                    reverse('posts:add_comment', kwargs=post_kwargs),
+                    {'text': LOADTEST_TEXT})
+        # A self-follow is refused and would corrupt visitor.following
+        authors = [
+            author for author in self.authors
+            if author != visitor.user.username
+        ]
+        if not authors:
+            return 'index', 'get', reverse('posts:index'), None
+        author = authors[skewed_index(rng, len(authors))]
+        if author in visitor.following:
+            visitor.following.discard(author)
+            name = 'profile_unfollow'
+        else:
+            visitor.following.add(author)
+            name = 'profile_follow'
+        return (name, 'get',
+                reverse(f'posts:{name}', kwargs={'username': author}), None)
+
+    def call(self, factory, visitor, method, url, data):
+        environ = wsgi_environ(
+            factory, method, url, data,
+            visitor.cookie_header, visitor.csrf_token)
+        status, _ = call_wsgi(self.application, environ)
+        return status.startswith(OK_STATUSES)
+
+    def worker(self, index, tickets, deadline):
+        rng = random.Random(f'{self.seed}-{index}')
+        factory = RequestFactory()
+        visitors = self.users[index::self.threads]
+        samples = []
+        try:
+            for step, number in enumerate(tickets):
+                if number >= self.requests or time.perf_counter() > deadline:
+                    break
+                visitor = visitors[step % len(visitors)]
+                endpoint, method, url, data = self.action(rng, visitor)
+                started = time.perf_counter()
+                try:
+                    ok = self.call(factory, visitor, method, url, data)
+                except Exception:
+                    ok = False
+                samples.append(
+                    (endpoint, (time.perf_counter() - started) * 1000, ok))
+        finally:
+            # Every thread has its own connection
+            connection.close()
+        return samples
+
+    def run(self):
+        threads = min(self.threads, len(self.users))
+        self.threads = threads
+        # Shared by all threads: next() on count is atomic
+        tickets = count()
+        deadline = float('inf')
+        if self.duration is not None:
+            deadline = time.perf_counter() + self.duration
+        # Tracebacks of every locked write would drown the report
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            with override_settings(DEBUG=False,
+                                   ALLOWED_HOSTS=['testserver']):
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=threads) as executor:
+                    futures = [
+                        executor.submit(
+                            self.worker, index, tickets, deadline)
+                        for index in range(threads)
+                    ]
+                    samples = [
+                        sample for future in futures
+                        for sample in future.result()
+                    ]
+                elapsed = time.perf_counter() - started
+        finally:
+            request_logger.setLevel(level)
+            self.cleanup()
+        return summarize(samples, elapsed)
+
+    def cleanup(self):
+        """Удаляет комментарии прогона и возвращает подписки как были."""
+        delete_generated(LOADTEST_TEXT)
+        current = self.current_follows()
+        for user_id, author_id in current - self.follows:
+            Follow.objects.filter(user=user_id, author=author_id).delete()
+        for user_id, author_id in self.follows - current:
+            Follow.objects.create(user_id=user_id, author_id=author_id)
+
+
+def summarize(samples, elapsed):
+    """Пропускная способность, перцентили и доля ошибок по эндпоинтам."""
+    endpoints = defaultdict(list)
+    for endpoint, latency, ok in samples:
+        endpoints[endpoint].append((latency, ok))
+    endpoints['total'] = [(latency, ok) for _, latency, ok in samples]
+    results = {}
+    for endpoint, rows in endpoints.items():
+        if not rows:
+            continue
+        latencies = [latency for latency, _ in rows]
+        errors = sum(1 for _, ok in rows if not ok)
+        results[endpoint] = {
+            'requests': len(rows),
+            'rps': round(len(rows) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'errors': errors,
+            'error_rate': round(errors / len(rows), 4),
+        }
+    return {'elapsed_s': round(elapsed, 3), 'endpoints': results}
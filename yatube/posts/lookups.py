@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from core import metrics
+
+from . import feed_cache
+from .models import Group, User
+
+
+class LookupCache:
+    """
+    LRU в памяти процесса: строка по уникальному полю или ее отсутствие.
+
+    В своем процессе записи сбрасывают сигналы сохранения и удаления.
+    Счетчики меняются UPDATE без сигналов, поэтому найденная строка
+    помнит версию ленты feed своего pk и перечитывается, когда версия
+    сменилась; правки без версии остальные воркеры увидят через
+    LOOKUP_CACHE_TTL. Каждый вызов получает новые экземпляры модели
+    и связанных объектов related, они не делятся между запросами.
+    """
+
+    def __init__(self, name, queryset, field, feed, related=()):
+        self.name = name
+        self.queryset = queryset.select_related(*related)
+        self.field = field
+        self.feed = feed
+        self.related = related
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Loads that started before an invalidation are not stored
+        self._generation = 0
+
+    def version(self, pk):
+        version, = feed_cache.get_versions((self.feed, pk))
+        return version
+
+    def get(self, value):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(value)
+            if entry is not None and entry[0] <= now:
+                entry = None
+            generation = self._generation
+        version = None
+        if entry is not None and entry[1] is not None:
+            pk, stored_version = entry[2]
+            version = self.version(pk)
+            if version != stored_version:
+                entry = None
+        if entry is not None:
+            with self._lock:
+                if value in self._entries:
+                    self._entries.move_to_end(value)
+            metrics.LOOKUP_HITS.inc(self.name)
+            return self.build(entry[1])
+        metrics.LOOKUP_MISSES.inc(self.name)
+        instance = self.queryset.filter(**{self.field: value}).first()
+        row = key = None
+        if instance is not None:
+            row = self.row(instance, self.related)
+            if version is None:
+                # A cold load reads the version after the row: a bump in
+                # between leaves it stale for at most LOOKUP_CACHE_TTL
+                version = self.version(instance.pk)
+            key = (instance.pk, version)
+        with self._lock:
+            if generation == self._generation:
+                self._entries[value] = (
+                    now + settings.LOOKUP_CACHE_TTL, row, key)
+                self._entries.move_to_end(value)
+                while len(self._entries) > settings.LOOKUP_CACHE_SIZE:
+                    self._entries.popitem(last=False)
+        return instance
+
+    def row(self, instance, related=()):
+        fields = {
+            field.attname: getattr(instance, field.attname)
+            for field in instance._meta.concrete_fields
+        }
+        children = {}
+        for name in related:
+            # Loaded by select_related, a missing row is cached as None
+            child = instance._meta.get_field(name).get_cached_value(
+                instance, None)
+            children[name] = None if child is None else self.row(child)
+        return type(instance), instance._state.db, fields, children
+
+    def build(self, row):
+        if row is None:
+            return None
+        model, db, fields, children = row
+        instance = model.from_db(db, list(fields), list(fields.values()))
+        for name, child in children.items():
+            if child is None:
+                instance._meta.get_field(name).set_cached_value(
+                    instance, None)
+            else:
+                setattr(instance, name, self.build(child))
+        return instance
+
+    def invalidate(self, instance):
+        """Забывает строку по новому значению поля и по pk (старому)."""
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(getattr(instance, self.field), None)
+            stale = [
+                value for value, (expires, row, key) in self._entries.items()
+                if key is not None and key[0] == instance.pk
+            ]
+            for value in stale:
+                del self._entries[value]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'hits': metrics.LOOKUP_HITS.value(self.name),
+            'misses': metrics.LOOKUP_MISSES.value(self.name),
+            'size': len(self._entries),
+        }
+
+
+# Profile counters and posts_count move with the PROFILE and GROUP feeds
+USERS = LookupCache(
+    'users', User.objects.all(), 'username', feed_cache.PROFILE,
+    related=('profile',))
+GROUPS = LookupCache('groups', Group.objects.all(), 'slug', feed_cache.GROUP)
+
+
+def user(username):
+    """Пользователь по username с профилем или None."""
+    return USERS.get(username)
+
+
+def group(slug):
+    """Группа по slug или None."""
+    return GROUPS.get(slug)
+
+
+def clear():
+    USERS.clear()
+    GROUPS.clear()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = ('Дозаполняет ленты подписок постами авторов, которые '
+            'перестали быть крупными')
+
+    def handle(self, *args, **options):
+        authors = timeline.backfill_pending()
+        self.stdout.write(
+            self.style.SUCCESS(f'Дозаполнено авторов: {authors}')
+        )
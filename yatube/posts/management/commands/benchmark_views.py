@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет представления постов на синтетических данных: медиана, '
+        'p95, число запросов и пик аллокаций'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            choices=benchmarks.SCALES,
+            default='1k',
+            help='Размер набора данных',
+        )
+        parser.add_argument(
+            '--data-dir',
+            default=os.path.join(tempfile.gettempdir(), 'yatube-benchmarks'),
+            help='Каталог баз с наборами данных, переиспользуются',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--views',
+            nargs='+',
+            choices=benchmarks.VIEWS,
+            default=benchmarks.VIEWS,
+        )
+        parser.add_argument(
+            '--warm',
+            action='store_true',
+            help='Замерить еще и с прогретыми кэшами, отдельно от холодных',
+        )
+        parser.add_argument('--output', help='JSON с результатами')
+        parser.add_argument('--baseline', help='JSON прошлого прогона')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=benchmarks.THRESHOLD,
+            help='Допустимый рост медианы, во сколько раз',
+        )
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        os.makedirs(options['data_dir'], exist_ok=True)
+        benchmarks.use_database(os.path.join(
+            options['data_dir'],
+            f'bench-{scale}-{options["seed"]}.sqlite3'
+        ))
+        self.stderr.write(f'Набор данных {scale}...')
+        if benchmarks.ensure_dataset(scale, options['seed']):
+            self.stderr.write('Набор данных создан')
+        runner = benchmarks.ViewBenchmark(
+            repeat=options['repeat'],
+            warmup=options['warmup'],
+            warm=options['warm'],
+        )
+        results = runner.run(options['views'])
+        data = benchmarks.report(scale, results, options['repeat'])
+        if options['output']:
+            benchmarks.save(options['output'], data)
+        else:
+            self.stdout.write(json.dumps(data, ensure_ascii=False, indent=2))
+        for name, result in results.items():
+            self.stderr.write(
+                f'{name:>18}: {result["median_ms"]:9.2f} ms median, '
+                f'{result["p95_ms"]:9.2f} ms p95, '
+                f'{result["queries"]:3} queries, '
+                f'{result["peak_alloc_kib"]:9.1f} KiB'
+            )
+        baseline = benchmarks.load(options['baseline'])
+        if baseline is None:
+            return
+        if baseline.get('scale') != scale:
+            raise CommandError(
+                f'Baseline is for scale {baseline.get("scale")}')
+        regressions = benchmarks.compare(
+            results, baseline, options['threshold'])
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно baseline:\n' + '\n'.join(regressions))
+        self.stderr.write(self.style.SUCCESS('Регрессий нет'))
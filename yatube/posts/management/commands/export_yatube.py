@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии и подписки в JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='Файл выгрузки, по умолчанию stdout',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=transfer.BATCH_SIZE,
+            help='Строк за одно чтение из БД',
+        )
+
+    def handle(self, *args, **options):
+        records = transfer.export_records(options['batch_size'])
+        try:
+            if options['output'] is None:
+                transfer.write_jsonl(records, self.stdout)
+                return
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                total = transfer.write_jsonl(records, stream)
+        except ValueError as error:
+            # Raised before the first record is written
+            raise CommandError(f'Export failed: {error}')
+        self.stderr.write(self.style.SUCCESS(f'Выгружено записей: {total}'))
@@ -0,0 +1,71 @@
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+CHUNK_SIZE = 50
+
+
+def image_chunks(size=CHUNK_SIZE):
+    """
+    Пачки имен картинок постов по pk.
+
+    Каждый запрос читается целиком: открытый курсор SQLite держал бы
+    блокировку чтения и мешал воркерам писать в хранилище sorl.
+    """
+    last_pk = 0
+    while True:
+        rows = list(
+            Post.objects.filter(pk__gt=last_pk)
+            .exclude(image='')
+            .order_by('pk')
+            .values_list('pk', 'image')[:size]
+        )
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        yield sorted({name for _, name in rows})
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры для уже загруженных картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.THUMBNAIL_WORKERS,
+            help='Число процессов, 0 - в текущем процессе',
+        )
+
+    def run_pool(self, workers):
+        """Держит в работе не больше 2 пачек на процесс."""
+        with thumbnails.create_executor(workers) as executor:
+            pending = set()
+            for chunk in image_chunks():
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from done
+                pending.add(executor.submit(thumbnails.generate_many, chunk))
+                self.total += len(chunk)
+            yield from wait(pending).done
+
+    def handle(self, *args, **options):
+        self.total = failed = 0
+        workers = options['workers']
+        if workers < 1:
+            results = []
+            for chunk in image_chunks():
+                self.total += len(chunk)
+                results.append(thumbnails.generate_many(chunk))
+        else:
+            results = (future.result() for future in self.run_pool(workers))
+        for failures in results:
+            for name, error in failures:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {self.total}, ошибок: {failed}'))
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Загружает JSONL-выгрузку export_yatube'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Файл выгрузки или - для stdin')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=transfer.BATCH_SIZE,
+            help='Объектов в одном bulk_create',
+        )
+        parser.add_argument(
+            '--media-dir',
+            help='MEDIA_ROOT источника: картинки копируются в хранилище',
+        )
+
+    def handle(self, *args, **options):
+        importer = transfer.Importer(
+            batch_size=options['batch_size'],
+            media_dir=options['media_dir'],
+        )
+        try:
+            if options['input'] == '-':
+                created = importer.run(transfer.read_jsonl(sys.stdin))
+            else:
+                with open(options['input'], encoding='utf-8') as stream:
+                    created = importer.run(transfer.read_jsonl(stream))
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Import failed: {error!r}')
+        for model, total in created.items():
+            self.stdout.write(f'{model}: {total}')
+        self.stdout.write(self.style.SUCCESS('Выгрузка загружена'))
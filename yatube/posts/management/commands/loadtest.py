@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmarks, loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон WSGI-приложения из пула потоков: пропускная '
+        'способность, p50/p95/p99 и доля ошибок по эндпоинтам'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            choices=benchmarks.SCALES,
+            help='Синтетический набор данных вместо рабочей базы',
+        )
+        parser.add_argument(
+            '--data-dir',
+            default=os.path.join(tempfile.gettempdir(), 'yatube-benchmarks'),
+            help='Каталог баз с наборами данных, общий с benchmark_views',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--users', type=int, default=32,
+            help='Число авторизованных посетителей',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Всего запросов за прогон',
+        )
+        parser.add_argument(
+            '--duration', type=float,
+            help='Остановиться через столько секунд',
+        )
+        parser.add_argument(
+            '--mix',
+            help='Веса сценариев, например index=60,post_detail=25,'
+                 'add_comment=10,follow=5',
+        )
+        parser.add_argument('--output', help='JSON с результатами')
+
+    def handle(self, *args, **options):
+        mix = None
+        if options['mix']:
+            try:
+                mix = loadtest.parse_mix(options['mix'])
+            except ValueError as error:
+                raise CommandError(error)
+        scale = options['scale']
+        if scale:
+            os.makedirs(options['data_dir'], exist_ok=True)
+            benchmarks.use_database(os.path.join(
+                options['data_dir'],
+                f'bench-{scale}-{options["seed"]}.sqlite3'
+            ))
+            self.stderr.write(f'Набор данных {scale}...')
+            if benchmarks.ensure_dataset(scale, options['seed']):
+                self.stderr.write('Набор данных создан')
+        try:
+            runner = loadtest.LoadTest(
+                threads=options['threads'],
+                users=options['users'],
+                requests=options['requests'],
+                duration=options['duration'],
+                mix=mix,
+                seed=options['seed'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        data = runner.run()
+        data.update(scale=scale, threads=runner.threads, mix=runner.mix)
+        if options['output']:
+            benchmarks.save(options['output'], data)
+        else:
+            self.stdout.write(json.dumps(data, ensure_ascii=False, indent=2))
+        for name, result in data['endpoints'].items():
+            self.stderr.write(
+                f'{name:>16}: {result["requests"]:6} req, '
+                f'{result["rps"]:8.1f} rps, '
+                f'{result["p50_ms"]:8.2f} / {result["p95_ms"]:8.2f} / '
+                f'{result["p99_ms"]:8.2f} ms p50/p95/p99, '
+                f'{result["error_rate"]:7.2%} errors'
+            )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок по таблице Follow'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=timeline.BATCH_SIZE,
+            help='Размер пачки для bulk_create',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = timeline.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Записей в лентах: {created}')
+        )
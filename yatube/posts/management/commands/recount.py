@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import counters, stored_files
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счетчики постов, комментариев, подписок '
+        'и ссылок на файлы'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = counters.recount()
+            updated['files'] = stored_files.recount()
+        for name, total in updated.items():
+            self.stdout.write(f'{name}: {total}')
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны'))
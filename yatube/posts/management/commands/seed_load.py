@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import seed
+from posts.models import Comment, Follow, Group, Post, User
+
+COUNTED = {
+    'users': User,
+    'groups': Group,
+    'posts': Post,
+    'comments': Comment,
+    'follows': Follow,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует синтетический набор данных: пользователей, группы, '
+        'посты, комментарии и подписки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=5000,
+            help='Попыток подписки, повторные пары отбрасываются',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Одинаковый seed дает одинаковый набор данных',
+        )
+        parser.add_argument('--days', type=int, default=365,
+                            help='Период публикации постов')
+        parser.add_argument('--batch-size', type=int,
+                            default=seed.BATCH_SIZE)
+        parser.add_argument('--prefix', default='load',
+                            help='Префикс имен пользователей и slug групп')
+
+    def handle(self, *args, **options):
+        seeder = seed.Seeder(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            days=options['days'],
+            prefix=options['prefix'],
+        )
+        started = time.monotonic()
+
+        def report(stage):
+            elapsed = time.monotonic() - started
+            model = COUNTED.get(stage)
+            total = f' (всего {model.objects.count()})' if model else ''
+            self.stdout.write(f'{stage}: готово за {elapsed:.1f} с{total}')
+
+        try:
+            seeder.run(
+                users=options['users'],
+                groups=options['groups'],
+                posts=options['posts'],
+                comments=options['comments'],
+                follows=options['follows'],
+                report=report,
+            )
+        except IntegrityError as error:
+            raise CommandError(
+                f'{error}. Этот seed уже загружен: задайте другой '
+                f'--seed или --prefix'
+            )
+        self.stdout.write(self.style.SUCCESS('Набор данных создан'))
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.28 on 2026-10-18 02:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, field, outer='pk'):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef(outer)})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    Profile = apps.get_model('users', 'Profile')
+    User = apps.get_model('auth', 'User')
+    Profile.objects.bulk_create(
+        Profile(user_id=pk)
+        for pk in User.objects.values_list('pk', flat=True)
+    )
+    Profile.objects.update(
+        posts_count=count_of(Post, 'author', 'user_id'),
+        followers_count=count_of(Follow, 'author', 'user_id'),
+        following_count=count_of(Follow, 'user', 'user_id'),
+    )
+    Group.objects.update(posts_count=count_of(Post, 'group'))
+    Post.objects.update(comments_count=count_of(Comment, 'post'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_timelineentry'),
+        ('users', '0001_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
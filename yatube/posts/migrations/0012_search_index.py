@@ -0,0 +1,59 @@
+from django.db import migrations
+
+# External content FTS5 tables share rowid with posts_post / posts_comment,
+# triggers keep them in sync with any write path (ORM, bulk, raw SQL).
+FTS_TABLES = (
+    ('posts_post_fts', 'posts_post'),
+    ('posts_comment_fts', 'posts_comment'),
+)
+
+CREATE_SQL = (
+    """CREATE VIRTUAL TABLE {fts} USING fts5(
+        text,
+        content='{table}',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN
+        INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN
+        INSERT INTO {fts}({fts}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER {fts}_au AFTER UPDATE OF text ON {table} BEGIN
+        INSERT INTO {fts}({fts}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    "INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+)
+
+DROP_SQL = (
+    'DROP TRIGGER IF EXISTS {fts}_ai',
+    'DROP TRIGGER IF EXISTS {fts}_ad',
+    'DROP TRIGGER IF EXISTS {fts}_au',
+    'DROP TABLE IF EXISTS {fts}',
+)
+
+
+def run_sql(statements):
+    def run(apps, schema_editor):
+        # FTS5 is SQLite only, posts.search falls back to LIKE elsewhere
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for fts, table in FTS_TABLES:
+            for statement in statements:
+                schema_editor.execute(statement.format(fts=fts, table=table))
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sql(CREATE_SQL), run_sql(DROP_SQL)),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='compact_image',
+            field=models.ImageField(blank=True, editable=False, upload_to='posts/compact/', verbose_name='Сжатая картинка'),
+        ),
+    ]
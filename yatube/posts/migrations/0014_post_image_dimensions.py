@@ -0,0 +1,52 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:05
+
+from django.core.files.images import get_image_dimensions
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def fill_dimensions(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    last_pk = 0
+    while True:
+        posts = list(
+            Post.objects.filter(pk__gt=last_pk)
+            .exclude(image='')
+            .order_by('pk')
+            .only('pk', 'image')[:BATCH_SIZE]
+        )
+        if not posts:
+            return
+        last_pk = posts[-1].pk
+        for post in posts:
+            try:
+                with default_storage.open(post.image.name) as file:
+                    width, height = get_image_dimensions(file)
+            except OSError:
+                # Missing file: leave dimensions empty
+                continue
+            Post.objects.filter(pk=post.pk).update(
+                image_width=width, image_height=height)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_compact_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина картинки'),
+        ),
+        migrations.RunPython(fill_dimensions, migrations.RunPython.noop),
+    ]
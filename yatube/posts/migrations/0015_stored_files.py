@@ -0,0 +1,59 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:10
+
+from django.db import migrations, models
+import posts.storage
+
+
+def count_references(apps, schema_editor):
+    # Existing files keep their names, they are only counted. One
+    # INSERT ... SELECT: the grouping never leaves the database
+    Post = apps.get_model('posts', 'Post')
+    StoredFile = apps.get_model('posts', 'StoredFile')
+    quote = schema_editor.connection.ops.quote_name
+    posts = quote(Post._meta.db_table)
+    selects = []
+    for field in ('image', 'compact_image'):
+        column = quote(Post._meta.get_field(field).column)
+        selects.append(
+            f"SELECT {column} AS name FROM {posts} "
+            f"WHERE {column} IS NOT NULL AND {column} != ''"
+        )
+    schema_editor.execute(
+        f'INSERT INTO {quote(StoredFile._meta.db_table)} '
+        f'({quote("name")}, {quote("references")}) '
+        f'SELECT name, COUNT(*) FROM ({" UNION ALL ".join(selects)}) files '
+        'GROUP BY name'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Имя файла')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Ссылок')),
+            ],
+            options={
+                'verbose_name': 'Файл',
+                'verbose_name_plural': 'Файлы',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='compact_image',
+            field=models.ImageField(blank=True, editable=False, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/compact/', verbose_name='Сжатая картинка'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
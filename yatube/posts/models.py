@@ -2,13 +2,20 @@ from django.db import models
 from django.db.models import CheckConstraint, Q, F
 from django.contrib.auth import get_user_model
 
+from .images import normalize_post_image
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
+# Shared by every post file field: identical uploads share one file
+post_storage = ContentAddressedStorage()
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField('Постов', default=0)
 
     class Meta:
         verbose_name = 'Группа'
@@ -38,17 +45,50 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=post_storage,
         blank=True
     )
+    # Filled on upload: ImageField(width_field=...) would read the file
+    # on every instance load until the fields are set
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', blank=True, null=True, editable=False)
+    compact_image = models.ImageField(
+        'Сжатая картинка',
+        upload_to='posts/compact/',
+        storage=post_storage,
+        blank=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
 
     class Meta:
         ordering = ('-pub_date',)  # Changed from list to tuple
         verbose_name = 'Запись'
         verbose_name_plural = 'Записи'
+        # Feeds are ordered by (-pub_date, -pk): id closes every index
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_date_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_date_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_date_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        if self.image and not self.image._committed:
+            # New upload: bounded original + compact copy instead of raw file
+            normalize_post_image(self)
+        elif not self.image:
+            self.compact_image = None
+            self.image_width = self.image_height = None
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -73,6 +113,10 @@ class Comment(models.Model):
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(fields=('post', '-created', '-id'),
+                         name='comment_post_created_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -93,7 +137,13 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписки'
         verbose_name_plural = 'Подписки'
+        # The unique index covers (user, author); followers of an
+        # author are read through the reverse one
         unique_together = ('user', 'author')
+        indexes = (
+            models.Index(fields=('author', 'user'),
+                         name='follow_author_user_idx'),
+        )
 
         constraints = (
             CheckConstraint(
@@ -101,3 +151,35 @@ class Follow(models.Model):
                 name='user__neq__author'
             ),
         )
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: пост автора у каждого подписчика."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        unique_together = ('user', 'post')
+
+
+class StoredFile(models.Model):
+    """Число постов, ссылающихся на файл в хранилище по содержимому."""
+    name = models.CharField('Имя файла', max_length=100, unique=True)
+    references = models.PositiveIntegerField('Ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self):
+        return self.name
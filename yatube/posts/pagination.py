@@ -0,0 +1,199 @@
+import base64
+import binascii
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+POSTS_PER_PAGE = settings.POSTS_PER_PAGE
+COMMENTS_PER_PAGE = settings.COMMENTS_PER_PAGE
+FEED_ORDERING = ('-pub_date', '-pk')
+COMMENT_ORDERING = ('-created', '-pk')
+
+PAGE_MODE = 'page'
+CURSOR_MODE = 'cursor'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values):
+    """Упаковывает (дата, pk) в непрозрачный токен для ?after=/?before=."""
+    moment, pk = values
+    raw = f'{moment.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    padded = token + '=' * (-len(token) % 4)
+    try:
+        moment, pk = (
+            base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        )
+        moment = parse_datetime(moment)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor(token)
+    if moment is None:
+        raise InvalidCursor(token)
+    return moment, pk
+
+
+class CursorPage(Sequence):
+    """Страница keyset-пагинации, совместимая с шаблонами Page."""
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @cached_property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.cursor_for(self.object_list[-1])
+
+    @cached_property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.cursor_for(self.object_list[0])
+
+
+class CursorPaginator:
+    """
+    Keyset-пагинация по паре полей (дата, pk) без COUNT(*) и OFFSET.
+
+    Первое поле ordering должно быть DateTimeField, второе - pk;
+    оба поля сортируются в одном направлении.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = tuple(field.lstrip('-') for field in self.ordering)
+        self.descending = self.ordering[0].startswith('-')
+
+    @cached_property
+    def count(self):
+        # Only for templates that still show the total, never used to page
+        return self.object_list.count()
+
+    def values_of(self, obj):
+        if isinstance(obj, dict):
+            # Rows of .values()
+            return [obj[field] for field in self.fields]
+        return [getattr(obj, field) for field in self.fields]
+
+    def cursor_for(self, obj):
+        return encode_cursor(self.values_of(obj))
+
+    def _seek(self, values, forward):
+        """Условие "строго после" (forward) или "строго до" курсора."""
+        lookup = 'lt' if self.descending == forward else 'gt'
+        first, second = self.fields
+        return (
+            Q(**{f'{first}__{lookup}': values[0]})
+            | Q(**{first: values[0], f'{second}__{lookup}': values[1]})
+        )
+
+    def _reversed_ordering(self):
+        return tuple(
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in self.ordering
+        )
+
+    def _exists_beyond(self, rows, forward):
+        """
+        Есть ли строки за краем страницы: после последней (forward)
+        или до первой. У пустой страницы за краем лежат все строки.
+        """
+        if not rows:
+            return self.object_list.exists()
+        edge = rows[-1] if forward else rows[0]
+        return self.object_list.filter(
+            self._seek(self.values_of(edge), forward=forward)
+        ).exists()
+
+    def page(self, after=None, before=None):
+        """
+        Страница после курсора after или до курсора before.
+
+        Флаг своей стороны дает лишняя (per_page + 1) строка выборки,
+        флаг другой стороны - запрос exists() за краем страницы.
+        """
+        queryset = self.object_list
+        limit = self.per_page + 1
+        if before is not None:
+            values = decode_cursor(before)
+            rows = list(
+                queryset.filter(self._seek(values, forward=False))
+                .order_by(*self._reversed_ordering())[:limit]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            rows.reverse()
+            has_next = self._exists_beyond(rows, forward=True)
+            return CursorPage(rows, self, has_next, has_previous)
+        queryset = queryset.order_by(*self.ordering)
+        if after is not None:
+            queryset = queryset.filter(
+                self._seek(decode_cursor(after), forward=True)
+            )
+        rows = list(queryset[:limit])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        has_previous = (
+            after is not None and self._exists_beyond(rows, forward=False))
+        return CursorPage(rows, self, has_next, has_previous)
+
+    def get_page(self, after=None, before=None):
+        """Как Paginator.get_page: битый токен открывает первую страницу."""
+        try:
+            return self.page(after=after, before=before)
+        except InvalidCursor:
+            return self.page()
+
+
+def get_pagination_mode(request):
+    if 'after' in request.GET or 'before' in request.GET:
+        return CURSOR_MODE
+    if 'page' in request.GET:
+        return PAGE_MODE
+    return getattr(settings, 'POSTS_PAGINATION_MODE', PAGE_MODE)
+
+
+def paginate(request, object_list, per_page=POSTS_PER_PAGE):
+    """Возвращает страницу ленты в режиме номеров страниц или курсора."""
+    if get_pagination_mode(request) == CURSOR_MODE:
+        return CursorPaginator(object_list, per_page).get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    paginator = Paginator(object_list, per_page)
+    return paginator.get_page(request.GET.get('page'))
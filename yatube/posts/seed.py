@@ -0,0 +1,188 @@
+import random
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+
+from users.models import Profile
+
+from . import feed_cache, transfer
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 5000
+# Fixed end of the generated period: the same seed gives the same dataset
+UNTIL = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+WORDS = (
+    'сегодня', 'вчера', 'город', 'утро', 'вечер', 'кофе', 'книга', 'фильм',
+    'дорога', 'море', 'горы', 'лес', 'работа', 'проект', 'код', 'python',
+    'django', 'ошибка', 'релиз', 'тест', 'кошка', 'собака', 'погода',
+    'дождь', 'снег', 'солнце', 'поезд', 'отпуск', 'друзья', 'музыка',
+    'концерт', 'рецепт', 'ужин', 'завтрак', 'прогулка', 'фото', 'новости',
+    'идея', 'вопрос', 'ответ', 'история', 'путешествие', 'спорт', 'бег',
+    'велосипед', 'выставка', 'театр', 'лекция', 'курс', 'домашка',
+)
+
+
+def skewed_index(rng, size):
+    """
+    Индекс в [0, size) с распределением Ципфа (s=1): 0 - самый популярный.
+
+    Обратное преобразование log-равномерной величины: O(1) без таблиц
+    весов, поэтому годится для миллионов объектов.
+    """
+    return min(int((size + 1) ** rng.random()) - 1, size - 1)
+
+
+def chunked(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(start + batch_size, total)
+
+
+def last_pk(model):
+    return model.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+def new_pks(model, after):
+    """pk строк, вставленных после after, по порядку вставки."""
+    return array('l', model.objects.filter(pk__gt=after).order_by(
+        'pk').values_list('pk', flat=True).iterator())
+
+
+class Seeder:
+    """
+    Синтетический набор данных для нагрузочных замеров.
+
+    Популярность авторов по Ципфу: популярные пишут больше постов,
+    получают больше подписчиков и комментариев. Для ссылок в памяти
+    держатся только массивы pk и дат, без объектов моделей.
+    """
+
+    def __init__(self, seed=0, batch_size=BATCH_SIZE, days=365,
+                 prefix='load'):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.batch_size = batch_size
+        self.span = timedelta(days=days).total_seconds()
+        self.prefix = prefix
+
+    def save(self, model, objects):
+        # Django picks the INSERT size the database accepts
+        with transaction.atomic():
+            model.objects.bulk_create(objects)
+
+    def text(self, low, high):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        return ' '.join(words).capitalize()
+
+    def create_users(self, total):
+        before = last_pk(User)
+        # Seeded users can't log in: one unusable hash for all
+        password = make_password(None)
+        for start, stop in chunked(total, self.batch_size):
+            self.save(User, [
+                User(username=f'{self.prefix}{self.seed}_{i}',
+                     password=password)
+                for i in range(start, stop)
+            ])
+        # Popularity rank -> user pk
+        self.authors = new_pks(User, before)
+        for start, stop in chunked(len(self.authors), self.batch_size):
+            self.save(Profile, [
+                Profile(user_id=pk) for pk in self.authors[start:stop]
+            ])
+        self.rng.shuffle(self.authors)
+
+    def create_groups(self, total):
+        before = last_pk(Group)
+        self.save(Group, [
+            Group(
+                title=f'Группа {i}',
+                slug=f'{self.prefix}-{self.seed}-{i}',
+                description=self.text(5, 20),
+            )
+            for i in range(total)
+        ])
+        self.groups = new_pks(Group, before)
+
+    def create_posts(self, total):
+        before = last_pk(Post)
+        # pub_date grows with pk: Poisson process over the period
+        self.post_times = array('d')
+        until = UNTIL.timestamp()
+        moment = until - self.span
+        rate = total / self.span
+        for start, stop in chunked(total, self.batch_size):
+            posts = []
+            for _ in range(start, stop):
+                moment = min(moment + self.rng.expovariate(rate), until)
+                self.post_times.append(moment)
+                group_id = None
+                if self.groups and self.rng.random() < 0.7:
+                    group_id = self.groups[
+                        skewed_index(self.rng, len(self.groups))]
+                posts.append(Post(
+                    author_id=self.authors[
+                        skewed_index(self.rng, len(self.authors))],
+                    group_id=group_id,
+                    text=self.text(5, 60),
+                    pub_date=datetime.fromtimestamp(moment, timezone.utc),
+                ))
+            self.save(Post, posts)
+        self.posts = new_pks(Post, before)
+
+    def create_comments(self, total):
+        posts = len(self.post_times)
+        until = UNTIL.timestamp()
+        for start, stop in chunked(total, self.batch_size):
+            comments = []
+            for _ in range(start, stop):
+                # Recent posts are discussed more
+                index = posts - 1 - skewed_index(self.rng, posts)
+                created = min(
+                    self.post_times[index] + self.rng.expovariate(1 / 3600),
+                    until,
+                )
+                comments.append(Comment(
+                    post_id=self.posts[index],
+                    author_id=self.rng.choice(self.authors),
+                    text=self.text(2, 25),
+                    created=datetime.fromtimestamp(created, timezone.utc),
+                ))
+            self.save(Comment, comments)
+
+    def create_follows(self, total):
+        """Степенной граф: подписываются чаще на популярных авторов."""
+        for start, stop in chunked(total, self.batch_size):
+            follows = []
+            for _ in range(start, stop):
+                user_id = self.rng.choice(self.authors)
+                author_id = self.authors[
+                    skewed_index(self.rng, len(self.authors))]
+                if user_id != author_id:
+                    follows.append(
+                        Follow(user_id=user_id, author_id=author_id))
+            with transaction.atomic():
+                # Repeated pairs are dropped by unique_together
+                Follow.objects.bulk_create(follows, ignore_conflicts=True)
+
+    def run(self, users, groups, posts, comments, follows, report=None):
+        """Создает набор данных; report(stage) вызывается после этапов."""
+        report = report or (lambda stage: None)
+        stages = (
+            ('users', self.create_users, users),
+            ('groups', self.create_groups, groups),
+            ('posts', self.create_posts, posts if users else 0),
+            ('comments', self.create_comments,
+             comments if users and posts else 0),
+            ('follows', self.create_follows, follows if users > 1 else 0),
+        )
+        with transfer.keep_dates():
+            for stage, create, total in stages:
+                create(total)
+                report(stage)
+        transfer.rebuild_derived(self.batch_size)
+        feed_cache.bump((feed_cache.INDEX, None))
+        report('counters')
@@ -0,0 +1,166 @@
+from django.db.models.signals import (post_delete, post_init, post_migrate,
+                                      post_save)
+from django.dispatch import receiver
+
+from . import (counters, feed_cache, fulltext, lookups, stored_files,
+               timeline)
+from .models import Comment, Follow, Group, Post, User
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # Group may change on edit, the old group must be updated too
+    instance._original_group_id = instance.__dict__.get('group_id')
+    # Replaced or cleared files lose a reference on save
+    instance._original_files = stored_files.names(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    original_group_id = instance._original_group_id
+    stored_files.update(
+        instance, set() if created else instance._original_files)
+    if created:
+        timeline.fan_out(instance)
+        counters.change_profile(instance.author_id, 1, 'posts_count')
+        counters.change_group(instance.group_id, 1)
+    elif original_group_id != instance.group_id:
+        counters.change_group(original_group_id, -1)
+        counters.change_group(instance.group_id, 1)
+    feed_cache.bump(
+        (feed_cache.POST, instance.pk),
+        *feed_cache.post_feeds(
+            instance.author_id, instance.group_id, original_group_id
+        )
+    )
+    instance._original_group_id = instance.group_id
+    instance._original_files = stored_files.names(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    for name in stored_files.names(instance):
+        stored_files.release(name)
+    counters.change_profile(instance.author_id, -1, 'posts_count')
+    counters.change_group(instance._original_group_id, -1)
+    feed_cache.bump(
+        (feed_cache.POST, instance.pk),
+        *feed_cache.post_feeds(
+            instance.author_id, instance.group_id,
+            instance._original_group_id
+        )
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post(instance.post_id, 1)
+    # Feeds show no comment data, the post page does
+    feed_cache.bump(
+        (feed_cache.POST, instance.post_id),
+        (feed_cache.COMMENTS, None),
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_post(instance.post_id, -1)
+    # Feeds show no comment data, the post page does
+    feed_cache.bump(
+        (feed_cache.POST, instance.post_id),
+        (feed_cache.COMMENTS, None),
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    lookups.GROUPS.invalidate(instance)
+    feed_cache.bump(
+        (feed_cache.INDEX, None),
+        (feed_cache.GROUP, instance.pk),
+    )
+
+
+def follow_feeds(follow):
+    # Profile pages show follower counts and the follow button
+    return (
+        (feed_cache.FOLLOW, follow.user_id),
+        (feed_cache.PROFILE, follow.user_id),
+        (feed_cache.PROFILE, follow.author_id),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_profile(instance.user_id, 1, 'following_count')
+        counters.change_profile(instance.author_id, 1, 'followers_count')
+        timeline.add_author(instance.user_id, instance.author_id)
+    feed_cache.bump(*follow_feeds(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_profile(instance.user_id, -1, 'following_count')
+    counters.change_profile(instance.author_id, -1, 'followers_count')
+    timeline.remove_author(instance.user_id, instance.author_id)
+    timeline.author_unfollowed(instance.author_id)
+    feed_cache.bump(*follow_feeds(instance))
+
+
+def user_names(user):
+    return (
+        user.__dict__.get('username'),
+        user.__dict__.get('first_name'),
+        user.__dict__.get('last_name'),
+    )
+
+
+@receiver(post_init, sender=User)
+def remember_names(sender, instance, **kwargs):
+    instance._original_names = user_names(instance)
+
+
+def name_feeds(user):
+    """Ленты, где видно имя пользователя, кроме его профиля."""
+    original = user._original_names
+    if original == user_names(user):
+        return []
+    # Feeds show full names and link authors by username
+    group_ids = Post.objects.filter(
+        author=user, group__isnull=False,
+    ).order_by().values_list('group_id', flat=True).distinct()
+    feeds = [(feed_cache.INDEX, None)]
+    feeds += [(feed_cache.GROUP, group_id) for group_id in group_ids]
+    if original[0] != user.username:
+        # Comment lists show the username only
+        post_ids = Comment.objects.filter(
+            author=user).order_by().values_list('post_id', flat=True)
+        feeds += [
+            (feed_cache.POST, post_id) for post_id in post_ids.distinct()
+        ]
+    return feeds
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Login only touches last_login, names are shown on cached pages
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    lookups.USERS.invalidate(instance)
+    feeds = [] if created else name_feeds(instance)
+    feed_cache.bump((feed_cache.PROFILE, instance.pk), *feeds)
+    instance._original_names = user_names(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    lookups.USERS.invalidate(instance)
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    if sender.name == 'posts':
+        fulltext.ensure_index(using)
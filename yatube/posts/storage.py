@@ -0,0 +1,46 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файлы называются по SHA-256 содержимого: одинаковые загрузки
+    делят один физический файл, а значит и его миниатюры sorl.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks(CHUNK_SIZE):
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        hexdigest = digest.hexdigest()
+        return os.path.join(
+            directory, hexdigest[:2], hexdigest + extension
+        ).replace('\\', '/')
+
+    def get_available_name(self, name, max_length=None):
+        # The name is the content: a taken name already holds these bytes.
+        # FileSystemStorage._save asks again after losing an O_EXCL race
+        if self.exists(name):
+            raise FileExistsError(name)
+        return name
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        try:
+            return super().save(name, content, max_length)
+        except FileExistsError:
+            # Same bytes are already stored, maybe by a concurrent upload
+            return name
@@ -0,0 +1,110 @@
+import logging
+
+from django.db import connection, transaction
+from django.db.models import F
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from . import counters
+from .models import Post, StoredFile, post_storage
+
+logger = logging.getLogger(__name__)
+
+# File fields of Post kept in the content-addressed storage
+FIELDS = ('image', 'compact_image')
+BATCH_SIZE = 1000
+
+
+def names(post):
+    """Имена файлов поста, без обращения к дескрипторам полей."""
+    result = set()
+    for field in FIELDS:
+        value = post.__dict__.get(field)
+        name = getattr(value, 'name', value)
+        if name:
+            result.add(name)
+    return result
+
+
+def acquire(name):
+    stored = StoredFile.objects.filter(name=name)
+    # remove() may delete the row between the INSERT and the UPDATE
+    while not stored.update(references=F('references') + 1):
+        StoredFile.objects.bulk_create(
+            [StoredFile(name=name)], ignore_conflicts=True)
+
+
+def release(name):
+    """Снимает ссылку; файл без ссылок удаляется после коммита."""
+    stored = StoredFile.objects.filter(name=name)
+    counters.change(stored, -1, 'references')
+    if stored.filter(references=0).exists():
+        transaction.on_commit(lambda: remove(name))
+
+
+def remove(name):
+    """
+    Удаляет файл и его миниатюры, если на него так и нет ссылок.
+
+    Строка файла заблокирована до конца удаления: acquire() загрузки
+    с тем же содержимым ждет и создает строку заново.
+    """
+    with transaction.atomic():
+        stored = StoredFile.objects.select_for_update().filter(
+            name=name, references=0).first()
+        if stored is None:
+            # The same content was uploaded again meanwhile
+            return
+        try:
+            delete_thumbnails(ImageFile(name, post_storage))
+        except Exception:
+            logger.exception('Could not delete stored file %s', name)
+            return
+        stored.delete()
+
+
+def update(post, original_names):
+    current = names(post)
+    for name in current - original_names:
+        acquire(name)
+    for name in original_names - current:
+        release(name)
+
+
+def reference_counts_sql():
+    """Запрос (имя файла, число ссылок) по всем файловым полям постов."""
+    quote = connection.ops.quote_name
+    table = quote(Post._meta.db_table)
+    selects = []
+    for field in FIELDS:
+        column = quote(Post._meta.get_field(field).column)
+        selects.append(
+            f"SELECT {column} AS name FROM {table} "
+            f"WHERE {column} IS NOT NULL AND {column} != ''"
+        )
+    return (
+        f'SELECT name, COUNT(*) FROM ({" UNION ALL ".join(selects)}) files '
+        'GROUP BY name'
+    )
+
+
+def recount(batch_size=BATCH_SIZE):
+    """
+    Пересобирает счетчики ссылок, возвращает число файлов.
+
+    Строки группировки читаются пачками и сразу пишутся, память не
+    растет с числом файлов.
+    """
+    StoredFile.objects.all().delete()
+    created = 0
+    with connection.cursor() as cursor:
+        cursor.execute(reference_counts_sql())
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return created
+            StoredFile.objects.bulk_create(
+                StoredFile(name=name, references=total)
+                for name, total in rows
+            )
+            created += len(rows)
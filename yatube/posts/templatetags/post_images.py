@@ -0,0 +1,59 @@
+import logging
+
+from django import template
+from django.utils.html import format_html
+
+from sorl.thumbnail import get_thumbnail
+
+from posts.thumbnails import srcset_geometries
+
+logger = logging.getLogger(__name__)
+
+register = template.Library()
+
+
+def stored_size(image):
+    """Размеры картинки из полей поста, без чтения файла."""
+    instance = getattr(image, 'instance', None)
+    width = getattr(instance, 'image_width', None)
+    height = getattr(instance, 'image_height', None)
+    return (width, height) if width and height else (None, None)
+
+
+@register.simple_tag
+def responsive_image(image, geometry, css_class='card-img my-2', sizes=None,
+                     **options):
+    """
+    <img> с srcset из нескольких миниатюр sorl, размерами и loading=lazy.
+
+    Пример: {% responsive_image post.image "960x339" crop="center" %}
+    """
+    if not image:
+        return ''
+    width, height = stored_size(image)
+    ratio = width / height if width else None
+    try:
+        thumbnails = [
+            get_thumbnail(image, candidate, **options)
+            for candidate in srcset_geometries(geometry, ratio, width)
+        ]
+    except Exception:
+        # Same as {% thumbnail %}: a broken image must not break the page
+        logger.exception('Could not create thumbnails for %s', image)
+        return ''
+    # Missing source files give thumbnails without a size
+    thumbnails = [thumbnail for thumbnail in thumbnails if thumbnail.size]
+    if not thumbnails:
+        return ''
+    largest = thumbnails[-1]
+    srcset = ', '.join(
+        f'{thumbnail.url} {thumbnail.width}w'
+        for thumbnail in {item.url: item for item in thumbnails}.values()
+    )
+    if sizes is None:
+        sizes = f'(max-width: {largest.width}px) 100vw, {largest.width}px'
+    return format_html(
+        '<img class="{}" src="{}" srcset="{}" sizes="{}" width="{}" '
+        'height="{}" loading="lazy" alt="">',
+        css_class, largest.url, srcset, sizes, largest.width, largest.height,
+    )
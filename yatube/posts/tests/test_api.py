@@ -0,0 +1,150 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..pagination import POSTS_PER_PAGE
+
+POSTS_COUNT = POSTS_PER_PAGE + 5
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        for i in range(POSTS_COUNT):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+        cls.post = Post.objects.create(author=cls.reader, text='Читатель')
+        Comment.objects.create(
+            post=cls.post, author=cls.author, text='Комментарий')
+
+    def setUp(self):
+        self.client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        cache.clear()
+
+    def walk(self, url, **params):
+        """All results of a feed following the next links"""
+        results = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            results += data['results']
+            if data['next'] is None:
+                return results
+            response = self.client.get(data['next'])
+
+    def test_index_walks_all_posts_by_cursor(self):
+        """Feed is paged by cursor without gaps or duplicates"""
+        results = self.walk(reverse('api:index'))
+        self.assertEqual(
+            [item['id'] for item in results],
+            list(Post.objects.order_by('-pub_date', '-pk')
+                 .values_list('pk', flat=True))
+        )
+        self.assertEqual(results[0], {
+            'id': self.post.pk,
+            'text': 'Читатель',
+            'pub_date': results[0]['pub_date'],
+            'author': 'Reader',
+            'group': None,
+            'image': None,
+            'comments_count': 1,
+        })
+
+    def test_previous_link_returns_first_page(self):
+        """previous cursor leads back to the same first page"""
+        url = reverse('api:index')
+        first = self.client.get(url).json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual(
+            self.client.get(second['previous']).json()['results'],
+            first['results']
+        )
+
+    def test_sparse_fields(self):
+        """?fields= limits the keys of every item"""
+        response = self.client.get(
+            reverse('api:group_list', kwargs={'slug': 'group'}),
+            {'fields': 'id,author'}
+        )
+        for item in response.json()['results']:
+            self.assertEqual(set(item), {'id', 'author'})
+            self.assertEqual(item['author'], 'Author')
+
+    def test_bad_requests(self):
+        """Unknown fields and broken cursors are rejected with 400"""
+        url = reverse('api:index')
+        for params in ({'fields': 'id,password'}, {'after': '!!!'}):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('detail', response.json())
+
+    def test_detail_endpoints(self):
+        """Post, comments and profile mirror their HTML pages"""
+        post = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk}),
+            {'fields': 'text,comments_count'}
+        ).json()
+        self.assertEqual(post, {'text': 'Читатель', 'comments_count': 1})
+        comments = self.client.get(reverse(
+            'api:post_comments', kwargs={'post_id': self.post.pk})).json()
+        self.assertEqual(
+            [item['text'] for item in comments['results']], ['Комментарий'])
+        profile = self.client.get(
+            reverse('api:profile', kwargs={'username': 'Author'})).json()
+        self.assertEqual(profile['posts_count'], POSTS_COUNT)
+        posts = self.walk(
+            reverse('api:profile_posts', kwargs={'username': 'Author'}))
+        self.assertEqual(len(posts), POSTS_COUNT)
+
+    def test_missing_objects(self):
+        """Missing group, profile and post answer 404 in JSON"""
+        urls = (
+            reverse('api:group_list', kwargs={'slug': 'missing'}),
+            reverse('api:profile', kwargs={'username': 'missing'}),
+            reverse('api:profile_posts', kwargs={'username': 'missing'}),
+            reverse('api:post_detail', kwargs={'post_id': 0}),
+            reverse('api:post_comments', kwargs={'post_id': 0}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {'detail': 'Not found'})
+
+    def test_follow_feed(self):
+        """Follow feed needs a login and lists followed authors only"""
+        url = reverse('api:follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        Follow.objects.create(user=self.reader, author=self.author)
+        data = self.authorized_client.get(url, {'fields': 'author'}).json()
+        self.assertEqual(len(data['results']), POSTS_PER_PAGE)
+        self.assertEqual(
+            {item['author'] for item in data['results']}, {'Author'})
+
+    def test_conditional_get(self):
+        """API answers 304 while the feed does not change"""
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_comment_changes_feed_etags(self):
+        """Lists show comments_count, a comment changes their ETag"""
+        url = reverse('api:group_list', kwargs={'slug': self.group.slug})
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(
+            post=Post.objects.filter(group=self.group).first(),
+            author=self.reader, text='Новый')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,60 @@
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.test import TestCase
+
+from .. import benchmarks
+from ..models import Comment, Post
+from ..seed import Seeder
+
+
+class ViewBenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Seeder(seed=1).run(
+            users=10, groups=2, posts=40, comments=20, follows=20)
+
+    def setUp(self):
+        # The handler must not close the connection of the test transaction
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+
+    def test_every_view_measured(self):
+        """Each view gets timings, query count and allocation peak"""
+        posts, comments = Post.objects.count(), Comment.objects.count()
+        results = benchmarks.ViewBenchmark(repeat=2, warmup=0).run()
+        self.assertEqual(set(results), set(benchmarks.VIEWS))
+        for name, result in results.items():
+            with self.subTest(view=name):
+                self.assertGreater(result['median_ms'], 0)
+                self.assertGreaterEqual(result['p95_ms'], result['median_ms'])
+                self.assertGreater(result['queries'], 0)
+                self.assertGreater(result['peak_alloc_kib'], 0)
+        # Posts and comments written by the benchmark are removed
+        self.assertEqual(Post.objects.count(), posts)
+        self.assertEqual(Comment.objects.count(), comments)
+
+    def test_warm_measured_separately(self):
+        """--warm adds warm results next to the cold ones"""
+        results = benchmarks.ViewBenchmark(
+            repeat=2, warmup=0, warm=True).run(['index'])
+        self.assertEqual(set(results), {'index', 'index' + benchmarks.WARM})
+        self.assertLess(
+            results['index' + benchmarks.WARM]['queries'],
+            results['index']['queries'])
+
+    def test_compare_reports_regressions(self):
+        """Slower median and extra queries are regressions"""
+        baseline = {'results': {
+            'index': {'median_ms': 10, 'queries': 3},
+            'profile': {'median_ms': 10, 'queries': 3},
+        }}
+        results = {
+            'index': {'median_ms': 12, 'queries': 3},
+            'profile': {'median_ms': 20, 'queries': 4},
+            'post_create': {'median_ms': 50, 'queries': 9},
+        }
+        self.assertEqual(benchmarks.compare(results, baseline), [
+            'profile: median 10 -> 20 ms',
+            'profile: queries 3 -> 4',
+        ])
@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Post
+
+
+class DonutCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Пост автора', author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.post_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.profile_url = reverse(
+            'posts:profile', kwargs={'username': self.author.username})
+
+    def test_shell_shared_between_users(self):
+        """The second reader gets the cached body with own header"""
+        index = reverse('posts:index')
+        self.author_client.get(index)
+        response = self.reader_client.get(index)
+        self.assertTemplateNotUsed(response, 'posts/index.html')
+        self.assertTemplateUsed(response, 'includes/header.html')
+        self.assertContains(response, 'Пост автора')
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertNotContains(response, 'Пользователь: author')
+
+    def test_post_holes_filled_per_user(self):
+        """Edit button and comment form belong to the current viewer"""
+        edit_url = reverse('posts:post_edit', kwargs={'post_id': self.post.pk})
+        author_response = self.author_client.get(self.post_url)
+        reader_response = self.reader_client.get(self.post_url)
+        guest_response = Client().get(self.post_url)
+        self.assertTemplateNotUsed(reader_response, 'posts/post_detail.html')
+        self.assertContains(author_response, edit_url)
+        self.assertNotContains(reader_response, edit_url)
+        self.assertContains(reader_response, 'csrfmiddlewaretoken')
+        self.assertNotContains(guest_response, 'Добавить комментарий')
+        self.assertNotContains(guest_response, edit_url)
+
+    def test_follow_button_per_user(self):
+        """The cached profile shows each viewer their follow state"""
+        self.assertContains(
+            self.reader_client.get(self.profile_url), 'Отписаться')
+        other = User.objects.create_user(username='other')
+        client = Client()
+        client.force_login(other)
+        response = client.get(self.profile_url)
+        self.assertTemplateNotUsed(response, 'posts/profile.html')
+        self.assertContains(response, 'Подписаться')
+
+    def test_new_post_renders_new_shell(self):
+        """A feed version bump invalidates the shared body"""
+        self.reader_client.get(reverse('posts:index'))
+        Post.objects.create(text='Свежий пост', author=self.author)
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertTemplateUsed(response, 'posts/index.html')
+        self.assertContains(response, 'Свежий пост')
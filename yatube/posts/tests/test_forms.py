@@ -1,5 +1,8 @@
 import shutil
 import tempfile
+from io import BytesIO
+
+from PIL import Image, ImageCms
 
 from django.contrib.auth.models import User
 from django.test import Client, TestCase, override_settings
@@ -216,7 +219,7 @@ class PostWithImageFormTest(TestCase):
         self.assertTrue(
             Post.objects.filter(
                 text='Test text',
-                image='posts/small.gif'
+                image__regex=r'^posts/\w{2}/\w{64}\.gif$'
             ).exists()
         )
 
@@ -247,3 +250,65 @@ class PostWithImageFormTest(TestCase):
                 image='posts/not_gif.gif'
             )
         )
+
+    @staticmethod
+    def get_photo(size, orientation=None):
+        """JPEG like a phone photo: EXIF with orientation and camera model"""
+        image = Image.new('RGB', size, color=(200, 30, 30))
+        exif = image.getexif()
+        exif[0x0110] = 'Phone camera'
+        if orientation is not None:
+            exif[0x0112] = orientation
+        file = BytesIO()
+        image.save(file, 'JPEG', exif=exif)
+        return SimpleUploadedFile(
+            name='photo.jpg',
+            content=file.getvalue(),
+            content_type='image/jpeg'
+        )
+
+    @override_settings(POST_IMAGE_MAX_SIZE=100)
+    def test_uploaded_image_normalized(self):
+        """Upload is rotated by EXIF, downscaled and stripped of metadata"""
+        # Orientation 6: stored landscape, displayed rotated 90 degrees
+        self.authorized_client.post(
+            POST_CREATE_PAGE,
+            data={'text': 'Photo', 'image': self.get_photo((400, 200), 6)},
+        )
+        post = Post.objects.get(text='Photo')
+        with Image.open(post.image.path) as original:
+            self.assertEqual(original.format, 'JPEG')
+            self.assertEqual(original.size, (50, 100))
+            self.assertFalse(original.getexif())
+        with Image.open(post.compact_image.path) as compact:
+            self.assertEqual(compact.format, 'WEBP')
+            self.assertEqual(compact.size, (50, 100))
+            self.assertFalse(compact.getexif())
+
+    def test_png_icc_profile_stripped(self):
+        """PNG originals lose the ICC profile Pillow would copy"""
+        image = Image.new('RGB', (40, 30), color=(30, 200, 30))
+        icc = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB'))
+        file = BytesIO()
+        image.save(file, 'PNG', icc_profile=icc.tobytes())
+        self.authorized_client.post(
+            POST_CREATE_PAGE,
+            data={'text': 'Png', 'image': SimpleUploadedFile(
+                'picture.png', file.getvalue(), content_type='image/png')},
+        )
+        post = Post.objects.get(text='Png')
+        for field in (post.image, post.compact_image):
+            with self.subTest(name=field.name):
+                with Image.open(field.path) as stored:
+                    self.assertNotIn('icc_profile', stored.info)
+        self.assertTrue(post.image.name.endswith('.png'))
+
+    def test_small_image_keeps_size(self):
+        """Images inside the limit keep their dimensions"""
+        post = Post.objects.create(
+            author=self.user,
+            text='Small photo',
+            image=self.get_photo((40, 30)),
+        )
+        self.assertEqual((post.image.width, post.image.height), (40, 30))
+        self.assertTrue(post.compact_image.name.endswith('.webp'))
@@ -0,0 +1,102 @@
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Comment, Follow, Group, Post
+
+POSTS_COUNT = 30
+# url name -> (table of the listing query, index that must serve it)
+FEED_INDEXES = {
+    'index': ('posts_post', 'post_date_idx'),
+    'group_list': ('posts_post', 'post_group_date_idx'),
+    'profile': ('posts_post', 'post_author_date_idx'),
+    'post_detail': ('posts_comment', 'comment_post_created_idx'),
+}
+
+
+def explain(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{connection.ops.explain_query_prefix()} {sql}', params)
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Plans are SQLite specific')
+class FeedIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author, group=cls.group)
+            for i in range(POSTS_COUNT)
+        )
+        cls.post = Post.objects.first()
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.reader, text=f'Комм {i}')
+            for i in range(5)
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def plans(self, url, table):
+        """Планы запросов view, читающих строки table целиком."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        plans = [
+            explain(query['sql']) for query in queries.captured_queries
+            if f'"{table}"."text"' in query['sql']
+            and 'ORDER BY' in query['sql']
+        ]
+        self.assertTrue(plans, f'{url} does not read {table}')
+        return plans
+
+    def test_feeds_read_through_their_index(self):
+        """Listings walk their index in order: no sort, no table scan"""
+        kwargs = {
+            'group_list': {'slug': self.group.slug},
+            'profile': {'username': self.author.username},
+            'post_detail': {'post_id': self.post.pk},
+        }
+        for name, (table, index) in FEED_INDEXES.items():
+            url = reverse(f'posts:{name}', kwargs=kwargs.get(name))
+            for plan in self.plans(url, table):
+                with self.subTest(view=name, plan=plan):
+                    self.assertIn(f'INDEX {index}', plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_follow_feed_avoids_scans(self):
+        """Every table of the follow feed is searched through an index"""
+        for plan in self.plans(reverse('posts:follow_index'), 'posts_post'):
+            # Sorting the merged subscriptions is expected: it is
+            # bounded by the reader's timeline, not by the whole table
+            for line in plan.splitlines():
+                with self.subTest(line=line):
+                    self.assertFalse(
+                        line.startswith('SCAN')
+                        and 'INDEX' not in line
+                    )
+
+    def test_follow_lookups_are_covered(self):
+        """Both directions of a subscription never touch the table"""
+        followers = Follow.objects.filter(
+            author=self.author).values_list('user', flat=True)
+        self.assertIn(
+            'COVERING INDEX follow_author_user_idx', followers.explain())
+        following = Follow.objects.filter(
+            user=self.reader, author=self.author)
+        self.assertIn('COVERING INDEX', following.values('pk').explain())
+        self.assertIn('COVERING INDEX profile_followers_idx',
+                      timeline.large_authors().explain())
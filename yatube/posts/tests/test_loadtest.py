@@ -0,0 +1,66 @@
+from django.test import SimpleTestCase, TransactionTestCase
+
+import random
+
+from .. import loadtest
+from ..models import Comment, Follow
+from ..seed import Seeder
+
+
+class LoadTestTest(TransactionTestCase):
+    def setUp(self):
+        # Worker threads see only committed data
+        Seeder(seed=2).run(
+            users=8, groups=2, posts=30, comments=10, follows=10)
+
+    def test_report_per_endpoint(self):
+        """Every request is counted under its endpoint and in the total"""
+        comments = Comment.objects.count()
+        follows = set(Follow.objects.values_list('user', 'author'))
+        result = loadtest.LoadTest(
+            threads=2, users=4, requests=60,
+            mix={'index': 1, 'post_detail': 1, 'add_comment': 1,
+                 'follow': 1},
+        ).run()
+        endpoints = result['endpoints']
+        self.assertEqual(endpoints['total']['requests'], 60)
+        self.assertEqual(
+            sum(result['requests'] for name, result in endpoints.items()
+                if name != 'total'),
+            60,
+        )
+        self.assertTrue(
+            {'index', 'post_detail', 'add_comment'} <= set(endpoints))
+        for name, result in endpoints.items():
+            with self.subTest(endpoint=name):
+                self.assertGreater(result['rps'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+                self.assertLessEqual(result['p95_ms'], result['p99_ms'])
+                self.assertLessEqual(result['error_rate'], 1)
+        # Comments and follows written by the run are reverted
+        self.assertEqual(Comment.objects.count(), comments)
+        self.assertEqual(
+            set(Follow.objects.values_list('user', 'author')), follows)
+
+    def test_follow_skips_own_profile(self):
+        """Visitors never try to follow themselves"""
+        test = loadtest.LoadTest(users=1, mix={'follow': 1})
+        visitor = test.users[0]
+        test.authors = [visitor.user.username]
+        rng = random.Random(0)
+        self.assertEqual(test.action(rng, visitor)[0], 'index')
+        test.authors.append('other')
+        for _ in range(10):
+            url = test.action(rng, visitor)[2]
+            self.assertNotIn(f'/{visitor.user.username}/', url)
+        self.assertNotIn(visitor.user.username, visitor.following)
+
+
+class ParseMixTest(SimpleTestCase):
+    def test_parse_mix(self):
+        """Missing scenarios get zero weight, unknown ones are rejected"""
+        self.assertEqual(loadtest.parse_mix('index=3,follow=1'), {
+            'index': 3, 'post_detail': 0, 'add_comment': 0, 'follow': 1,
+        })
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix('search=1')
@@ -0,0 +1,117 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+
+from .. import lookups
+from ..models import Group, Post
+
+
+class LookupCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+
+    def setUp(self):
+        cache.clear()
+        lookups.clear()
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def test_hits_skip_database(self):
+        """A repeated lookup returns a fresh copy without a query"""
+        first = lookups.user('author')
+        with self.assertNumQueries(0):
+            second = lookups.user('author')
+        self.assertEqual(second, self.user)
+        self.assertIsNot(second, first)
+        self.assertEqual(lookups.USERS.stats(),
+                         {'hits': 1, 'misses': 1, 'size': 1})
+
+    def test_unknown_values_cached(self):
+        """Missing rows are remembered until such a row is created"""
+        self.assertIsNone(lookups.group('new'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(lookups.group('new'))
+        group = Group.objects.create(
+            title='Новая', slug='new', description='Описание')
+        self.assertEqual(lookups.group('new'), group)
+
+    def test_counters_cached_until_feed_bump(self):
+        """Profile and posts_count come from the cache, bumps reload them"""
+        lookups.user('author')
+        lookups.group('group')
+        with self.assertNumQueries(0):
+            self.assertEqual(lookups.user('author').profile.posts_count, 0)
+            self.assertEqual(lookups.group('group').posts_count, 0)
+        Post.objects.create(
+            text='Пост', author=self.user,
+            group=Group.objects.get(slug='group'))
+        self.assertEqual(lookups.user('author').profile.posts_count, 1)
+        self.assertEqual(lookups.group('group').posts_count, 1)
+
+    def test_signals_invalidate(self):
+        """Renames and deletes drop the cached row"""
+        lookups.user('author')
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertIsNone(lookups.user('author'))
+        self.assertEqual(lookups.user('renamed'), self.user)
+        lookups.group('group')
+        self.group.delete()
+        self.assertIsNone(lookups.group('group'))
+
+    @override_settings(LOOKUP_CACHE_SIZE=1)
+    def test_least_recently_used_evicted(self):
+        """The cache keeps at most LOOKUP_CACHE_SIZE entries"""
+        lookups.user('author')
+        lookups.user('missing')
+        with self.assertNumQueries(1):
+            lookups.user('author')
+        self.assertEqual(lookups.USERS.stats()['size'], 1)
+
+    @override_settings(LOOKUP_CACHE_TTL=0)
+    def test_expired_entries_reloaded(self):
+        """Entries older than LOOKUP_CACHE_TTL are loaded again"""
+        lookups.user('author')
+        with self.assertNumQueries(1):
+            lookups.user('author')
+
+    def test_views_use_cache_and_expose_stats(self):
+        """Profile and group pages look rows up once, stats in /metrics"""
+        client = Client()
+        profile = reverse('posts:profile', kwargs={'username': 'author'})
+        client.get(profile)
+        client.get(reverse('posts:group_list', kwargs={'slug': 'group'}))
+        self.assertEqual(
+            client.get(reverse(
+                'posts:profile', kwargs={'username': 'missing'}
+            )).status_code, 404)
+        text = client.get(reverse('metrics')).content.decode()
+        self.assertIn(
+            'yatube_lookup_cache_misses_total{cache="users"} 2', text)
+        self.assertIn(
+            'yatube_lookup_cache_hits_total{cache="groups"} 1', text)
+
+    def test_warm_lookups_render_without_row_queries(self):
+        """A new page shell with warm lookups only queries its posts"""
+        Post.objects.create(
+            text='Пост', author=self.user,
+            group=Group.objects.get(slug='group'))
+        client = Client()
+        for url, template in (
+            (reverse('posts:profile', kwargs={'username': 'author'}),
+             'posts/profile.html'),
+            (reverse('posts:group_list', kwargs={'slug': 'group'}),
+             'posts/group_list.html'),
+        ):
+            with self.subTest(url=url):
+                client.get(url)
+                # COUNT(*) and the page of posts
+                with self.assertNumQueries(2):
+                    response = client.get(url, {'page': 1})
+                self.assertTemplateUsed(response, template)
@@ -0,0 +1,125 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+
+from ..models import Post
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.client = Client()
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def sample(self, text, line):
+        for row in text.splitlines():
+            if row.startswith(line + ' '):
+                return float(row.rsplit(' ', 1)[1])
+        self.fail(f'{line} is not exposed')
+
+    def test_views_observed_by_url_name(self):
+        """Latency, queries, render time and size are kept per url name"""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        text = self.scrape()
+        index = '{view="posts:index"}'
+        detail = '{view="posts:post_detail"}'
+        self.assertEqual(self.sample(
+            text, f'yatube_request_duration_seconds_count{index}'), 2)
+        self.assertGreater(self.sample(
+            text, f'yatube_db_queries_sum{detail}'), 0)
+        self.assertGreater(self.sample(
+            text, f'yatube_db_duration_seconds_sum{detail}'), 0)
+        self.assertGreater(self.sample(
+            text, f'yatube_template_render_seconds_sum{detail}'), 0)
+        self.assertEqual(self.sample(
+            text, f'yatube_response_size_bytes_sum{detail}'),
+            len(response.content))
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      text)
+
+    def test_buckets_are_cumulative(self):
+        """Buckets count observations up to le, +Inf equals the count"""
+        histogram = metrics.Histogram('test_seconds', 'Test.', (0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3):
+            histogram.observe('posts:index', value)
+        data = {'test_seconds': histogram.series}
+        original = metrics.HISTOGRAMS
+        metrics.HISTOGRAMS = (histogram,)
+        self.addCleanup(setattr, metrics, 'HISTOGRAMS', original)
+        self.addCleanup(setattr, metrics, 'COUNTERS', metrics.COUNTERS)
+        metrics.COUNTERS = ()
+        self.assertEqual(metrics.exposition(data).splitlines(), [
+            '# HELP test_seconds Test.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{view="posts:index",le="0.1"} 1',
+            'test_seconds_bucket{view="posts:index",le="1.0"} 3',
+            'test_seconds_bucket{view="posts:index",le="+Inf"} 4',
+            'test_seconds_sum{view="posts:index"} 4.25',
+            'test_seconds_count{view="posts:index"} 4',
+        ])
+
+    def test_workers_are_aggregated(self):
+        """Files of other worker processes are merged into the output"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with override_settings(METRICS_DIR=directory):
+            self.client.get(reverse('posts:index'))
+            worker = metrics.snapshot()
+            with open(os.path.join(directory, 'metrics-1.json'), 'w') as file:
+                json.dump(worker, file)
+            self.client.get(reverse('posts:index'))
+            text = self.scrape()
+        self.assertEqual(self.sample(
+            text,
+            'yatube_request_duration_seconds_count{view="posts:index"}'), 3)
+
+    def test_exited_worker_retired(self):
+        """An exiting process folds its file into the retired totals"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with override_settings(METRICS_DIR=directory):
+            self.client.get(reverse('posts:index'))
+            own = metrics.process_file()
+            self.assertRegex(
+                os.path.basename(own), rf'^metrics-{os.getpid()}-\d+\.json$')
+            metrics.flush()
+            metrics.retire()
+            self.assertFalse(os.path.exists(own))
+            metrics.reset()
+            text = self.scrape()
+        self.assertEqual(self.sample(
+            text,
+            'yatube_request_duration_seconds_count{view="posts:index"}'), 1)
+
+    def test_unresolved_and_forbidden(self):
+        """Unknown urls share one label, /metrics is closed to others"""
+        self.client.get('/no/such/page/')
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="unresolved"} 1',
+            self.scrape())
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
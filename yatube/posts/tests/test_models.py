@@ -1,8 +1,23 @@
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
 from django.urls import reverse
-from django.test import Client, TestCase
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
 
-from ..models import Comment, Follow, Group, Post
+from io import BytesIO, StringIO
+import os
+import shutil
+import tempfile
+
+from PIL import Image
+
+from .. import stored_files, thumbnails
+from ..models import Comment, Follow, Group, Post, StoredFile
 
 GROUP_SLUG = 'test-slug'
 
@@ -108,3 +123,185 @@ class CommentModelTest(TestCase):
         comment = Comment.objects.get(pk=1)
         expected_comment_text = comment.text[:15]
         self.assertEqual(expected_comment_text, str(comment))
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='User')
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=GROUP_SLUG,
+            description='Тестовое описание',
+        )
+        cls.second_group = Group.objects.create(
+            title='Вторая группа',
+            slug='second-slug',
+            description='Тестовое описание',
+        )
+
+    def assertCounters(self, author_posts, group_posts, second_group_posts):
+        self.author.profile.refresh_from_db()
+        self.group.refresh_from_db()
+        self.second_group.refresh_from_db()
+        self.assertEqual(self.author.profile.posts_count, author_posts)
+        self.assertEqual(self.group.posts_count, group_posts)
+        self.assertEqual(self.second_group.posts_count, second_group_posts)
+
+    def test_post_counters(self):
+        """Post create, group change and delete keep counters in sync"""
+        post = Post.objects.create(
+            author=self.author, text='Текст', group=self.group)
+        self.assertCounters(1, 1, 0)
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.second_group
+        post.save()
+        self.assertCounters(1, 0, 1)
+        post.delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_comment_and_follow_counters(self):
+        """Comments and follows update stored counters"""
+        post = Post.objects.create(author=self.author, text='Текст')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Комментарий')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.author.profile.refresh_from_db()
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.author.profile.followers_count, 1)
+        self.assertEqual(self.user.profile.following_count, 1)
+        follow.delete()
+        self.author.profile.refresh_from_db()
+        self.assertEqual(self.author.profile.followers_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """recount command restores drifted counters"""
+        Post.objects.bulk_create(
+            Post(author=self.author, text='Текст', group=self.group)
+            for _ in range(3)
+        )
+        self.assertCounters(0, 0, 0)
+        call_command('recount', stdout=StringIO())
+        self.assertCounters(3, 3, 0)
+
+
+def get_image(color):
+    file = BytesIO()
+    Image.new('RGB', (20, 10), color).save(file, 'PNG')
+    return SimpleUploadedFile('meme.png', file.getvalue())
+
+
+class StoredFilesTest(TransactionTestCase):
+    # Files are removed on commit, so real transactions are needed
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        cache.clear()
+        self.user = User.objects.create_user(username='User')
+
+    def create_post(self, color='red'):
+        return Post.objects.create(
+            author=self.user, text='Текст', image=get_image(color))
+
+    def references(self, name):
+        stored = StoredFile.objects.filter(name=name).first()
+        return stored.references if stored else 0
+
+    def media_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(path, name), settings.MEDIA_ROOT)
+            for path, _, files in os.walk(settings.MEDIA_ROOT)
+            for name in files
+        )
+
+    def test_same_upload_shares_file(self):
+        """Identical uploads are stored once and counted per post"""
+        first, second = self.create_post(), self.create_post()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.compact_image.name, second.compact_image.name)
+        self.assertRegex(first.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}')
+        self.assertEqual(self.references(first.image.name), 2)
+        self.assertEqual(len(self.media_files()), 2)
+        self.assertNotEqual(
+            self.create_post('blue').image.name, first.image.name)
+
+    def test_file_removed_with_last_reference(self):
+        """Deleting posts removes the file and thumbnails only at the end"""
+        first, second = self.create_post(), self.create_post()
+        name = first.image.name
+        thumbnails.generate(name)
+        first.delete()
+        self.assertEqual(self.references(name), 1)
+        self.assertIn(name, self.media_files())
+        second.delete()
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertEqual(self.media_files(), [])
+
+    def test_replaced_image_released(self):
+        """Editing a post image releases the previous file"""
+        post = self.create_post()
+        old_name = post.image.name
+        post = Post.objects.get(pk=post.pk)
+        post.image = get_image('blue')
+        post.save()
+        self.assertEqual(self.references(old_name), 0)
+        self.assertEqual(self.references(post.image.name), 1)
+        self.assertNotIn(old_name, self.media_files())
+
+    def test_lost_create_race_reuses_file(self):
+        """A file created by a concurrent upload is reused, not suffixed"""
+        storage = Post._meta.get_field('image').storage
+        name = storage.save('posts/data.bin', ContentFile(b'data'))
+        with self.assertRaises(FileExistsError):
+            # What FileSystemStorage._save hits after losing O_EXCL
+            storage._save(name, ContentFile(b'data'))
+        self.assertEqual(
+            storage.save('posts/copy.bin', ContentFile(b'data')), name)
+        self.assertEqual(self.media_files(), [name])
+
+    def test_remove_keeps_reacquired_file(self):
+        """A reference taken before removal runs keeps the file"""
+        post = self.create_post()
+        name = post.image.name
+        with transaction.atomic():
+            # remove() runs on commit and finds the new reference
+            stored_files.release(name)
+            stored_files.acquire(name)
+        self.assertIn(name, self.media_files())
+        self.assertEqual(self.references(name), 1)
+        StoredFile.objects.filter(name=name).delete()
+        stored_files.acquire(name)
+        self.assertEqual(self.references(name), 1)
+
+    def test_recount_restores_references(self):
+        """recount command rebuilds reference counters"""
+        post = self.create_post()
+        StoredFile.objects.all().delete()
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(self.references(post.image.name), 1)
+        self.assertEqual(self.references(post.compact_image.name), 1)
+
+    def test_recount_in_batches(self):
+        """recount sums both file fields across several batches"""
+        user = User.objects.create_user(username='batches')
+        Post.objects.bulk_create([
+            Post(author=user, text='1', image='a.jpg', compact_image='b.jpg'),
+            Post(author=user, text='2', image='a.jpg', compact_image='a.jpg'),
+            Post(author=user, text='3', image='c.jpg'),
+        ])
+        self.assertEqual(stored_files.recount(batch_size=1), 3)
+        self.assertEqual(
+            dict(StoredFile.objects.values_list('name', 'references')),
+            {'a.jpg': 3, 'b.jpg': 1, 'c.jpg': 1})
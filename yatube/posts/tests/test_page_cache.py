@@ -0,0 +1,102 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.page_cache import HEADER
+
+from ..models import Comment, Group, Post
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            text='Пост автора', author=cls.author, group=cls.group)
+        cls.other_post = Post.objects.create(
+            text='Чужой пост', author=cls.other)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': self.author.username}),
+            'post': reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk}),
+            'other_post': reverse(
+                'posts:post_detail', kwargs={'post_id': self.other_post.pk}),
+            'about': reverse('about:author'),
+        }
+        for url in self.urls.values():
+            self.guest_client.get(url)
+
+    def assertCached(self, *names):
+        for name in names:
+            with self.subTest(page=name):
+                response = self.guest_client.get(self.urls[name])
+                self.assertEqual(response[HEADER], 'hit')
+
+    def assertPurged(self, *names):
+        for name in names:
+            with self.subTest(page=name):
+                response = self.guest_client.get(self.urls[name])
+                self.assertEqual(response[HEADER], 'miss')
+
+    def test_hits_skip_database(self):
+        """A cached page is served without a single query"""
+        with self.assertNumQueries(0):
+            self.assertCached(*self.urls)
+
+    def test_new_post_purges_its_pages_only(self):
+        """A post purges the index, its author profile and group"""
+        Post.objects.create(
+            text='Новый пост', author=self.author, group=self.group)
+        self.assertPurged('index', 'group', 'profile', 'post')
+        self.assertCached('other_post', 'about')
+        self.assertContains(
+            self.guest_client.get(self.urls['index']), 'Новый пост')
+
+    def test_comment_and_edits_purge_affected_pages(self):
+        """Comments, post and user edits purge the pages that show them"""
+        Comment.objects.create(
+            post=self.post, author=self.other, text='Комментарий')
+        # Feeds show no comment data
+        self.assertPurged('post')
+        self.assertCached('index', 'profile', 'group', 'other_post')
+        self.other.first_name = 'Имя'
+        self.other.save()
+        self.assertPurged('other_post')
+        self.assertCached('post', 'profile')
+
+    def test_rename_purges_feeds_with_the_name(self):
+        """Feeds showing the author's name drop it after a rename"""
+        self.author.first_name = 'Новое'
+        self.author.last_name = 'Имя'
+        self.author.save()
+        self.assertPurged('index', 'group', 'profile', 'post')
+        self.assertCached('other_post')
+        self.assertContains(
+            self.guest_client.get(self.urls['index']), 'Новое Имя')
+
+    def test_conditional_get_on_hit(self):
+        """Cached pages still answer If-None-Match with 304"""
+        response = self.guest_client.get(self.urls['post'])
+        response = self.guest_client.get(
+            self.urls['post'], HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_sessions_bypass_cache(self):
+        """Logged in visitors never get or fill cached pages"""
+        client = Client()
+        client.force_login(self.other)
+        response = client.get(self.urls['index'])
+        self.assertNotIn(HEADER, response)
+        self.assertContains(response, 'Выйти')
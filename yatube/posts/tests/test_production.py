@@ -0,0 +1,61 @@
+import importlib
+import os
+import shutil
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+from .. import feed_cache
+
+
+class ProductionSettingsTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.production = importlib.import_module('yatube.settings_production')
+
+    def test_debug_tools_disabled(self):
+        """Production runs without DEBUG and debug_toolbar"""
+        self.assertFalse(self.production.DEBUG)
+        self.assertNotIn('debug_toolbar', self.production.INSTALLED_APPS)
+        self.assertFalse(any(
+            middleware.startswith('debug_toolbar.')
+            for middleware in self.production.MIDDLEWARE
+        ))
+        self.assertGreater(
+            self.production.DATABASES['default']['CONN_MAX_AGE'], 0)
+
+    def test_cache_shared_between_workers(self):
+        """Feed versions live in a cache every worker sees"""
+        backend = self.production.CACHES['default']['BACKEND']
+        self.assertNotIn(backend, feed_cache.PROCESS_LOCAL_BACKENDS)
+
+    def test_pragmas_applied_to_new_connections(self):
+        """A new SQLite connection gets WAL and the other pragmas"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict,
+             'NAME': os.path.join(directory, 'db.sqlite3')},
+            alias='pragmas',
+        )
+        self.addCleanup(wrapper.close)
+        pragmas = self.production.SQLITE_PRAGMAS
+        # connection_created applies them, as for any real connection
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            wrapper.ensure_connection()
+        expected = {
+            'journal_mode': 'wal',
+            # NORMAL
+            'synchronous': 1,
+            'mmap_size': pragmas['mmap_size'],
+            'cache_size': pragmas['cache_size'],
+            'busy_timeout': pragmas['busy_timeout'],
+        }
+        with wrapper.cursor() as cursor:
+            for name, value in expected.items():
+                with self.subTest(pragma=name):
+                    cursor.execute(f'PRAGMA {name}')
+                    self.assertEqual(cursor.fetchone()[0], value)
@@ -0,0 +1,128 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import lookups
+from ..models import Comment, Follow, Group, Post
+from ..api_urls import urlpatterns as api_urlpatterns
+from ..urls import urlpatterns
+from .utils import QueryBudgetMixin
+
+AUTHORS_COUNT = 5
+POSTS_COUNT = 25
+COMMENTS_COUNT = 10
+# Query budget per url name for an authorized GET with a cold cache.
+# Budgets must not depend on page size: N+1 makes them overflow.
+# group_list, profile and post_detail spend one on the ETag lookup.
+QUERY_PARAMS = {
+    'search': {'q': 'Пост'},
+}
+QUERY_BUDGETS = {
+    'index': 4,
+    'group_list': 6,
+    'profile': 7,
+    'post_detail': 5,
+    'post_comments': 3,
+    'add_comment': 3,
+    'search': 6,
+    'post_create': 3,
+    'post_edit': 4,
+    'follow_index': 4,
+    'profile_follow': 12,
+    # one more to backfill an author that drops below the fan-out limit
+    'profile_unfollow': 8,
+}
+
+# JSON API skips templates: session, user, ETag lookup and one query
+API_QUERY_BUDGETS = {
+    'index': 3,
+    'group_list': 4,
+    'profile': 4,
+    'profile_posts': 4,
+    'post_detail': 4,
+    'post_comments': 4,
+    'follow_index': 3,
+}
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        authors = [
+            User.objects.create_user(username=f'Author{i}')
+            for i in range(AUTHORS_COUNT)
+        ]
+        groups = [
+            Group.objects.create(
+                title=f'Группа {i}',
+                slug=f'group-{i}',
+                description='Описание',
+            )
+            for i in range(AUTHORS_COUNT)
+        ]
+        for i in range(POSTS_COUNT):
+            Post.objects.create(
+                author=authors[i % AUTHORS_COUNT],
+                group=groups[i % AUTHORS_COUNT],
+                text=f'Пост {i}',
+            )
+        for author in authors[1:]:
+            Follow.objects.create(user=cls.user, author=author)
+        cls.post = Post.objects.create(author=cls.user, text='Свой пост')
+        for i in range(COMMENTS_COUNT):
+            Comment.objects.create(
+                post=cls.post,
+                author=authors[i % AUTHORS_COUNT],
+                text=f'Комментарий {i}',
+            )
+        cls.url_kwargs = {
+            'group_list': {'slug': groups[0].slug},
+            'profile': {'username': authors[0].username},
+            'post_detail': {'post_id': cls.post.pk},
+            'add_comment': {'post_id': cls.post.pk},
+            'post_edit': {'post_id': cls.post.pk},
+            'profile_follow': {'username': authors[0].username},
+            'profile_unfollow': {'username': authors[1].username},
+            'profile_posts': {'username': authors[0].username},
+            'post_comments': {'post_id': cls.post.pk},
+        }
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_every_posts_url_has_budget(self):
+        """Each view in posts.urls is covered by a query budget"""
+        names = {pattern.name for pattern in urlpatterns}
+        self.assertEqual(names, set(QUERY_BUDGETS))
+
+    def test_views_fit_query_budget(self):
+        """Views do not run a query per post or comment"""
+        for name, budget in QUERY_BUDGETS.items():
+            url = reverse(f'posts:{name}', kwargs=self.url_kwargs.get(name))
+            cache.clear()
+            lookups.clear()
+            with self.subTest(view=name):
+                with self.assertMaxQueries(budget):
+                    response = self.client.get(
+                        url, QUERY_PARAMS.get(name))
+                self.assertIn(response.status_code, (200, 302))
+
+    def test_every_api_url_has_budget(self):
+        """Each endpoint in posts.api_urls is covered by a query budget"""
+        names = {pattern.name for pattern in api_urlpatterns}
+        self.assertEqual(names, set(API_QUERY_BUDGETS))
+
+    def test_api_fits_query_budget(self):
+        """API endpoints stay within a few queries per request"""
+        for name, budget in API_QUERY_BUDGETS.items():
+            url = reverse(f'api:{name}', kwargs=self.url_kwargs.get(name))
+            cache.clear()
+            lookups.clear()
+            with self.subTest(view=name):
+                with self.assertMaxQueries(budget):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import replicas
+
+from .. import fulltext
+from ..models import Post
+
+REPLICA = 'replica'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRouterTest(TransactionTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        connections.databases[REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(directory, 'replica.sqlite3'),
+        }
+        self.addCleanup(self.remove_replica)
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Старый пост', author=self.author)
+        self.writer = Client()
+        self.writer.force_login(self.author)
+        # A local copy lags behind until the next sync
+        replicas.sync(REPLICA)
+        Post.objects.create(text='Не скопирован', author=self.author)
+        replicas.unpin()
+        cache.clear()
+
+    def remove_replica(self):
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        if hasattr(connections._connections, REPLICA):
+            delattr(connections._connections, REPLICA)
+        replicas.unpin()
+
+    def api_texts(self, client):
+        # The JSON API is not cached, its reads show the routing
+        response = client.get(reverse('api:index'))
+        return [post['text'] for post in response.json()['results']]
+
+    def test_reads_go_to_replica(self):
+        """Reads use the replica, writes and transactions the primary"""
+        self.assertEqual(Post.objects.count(), 1)
+        with transaction.atomic():
+            self.assertEqual(Post.objects.count(), 2)
+        replicas.unpin()
+        texts = self.api_texts(Client())
+        self.assertIn('Старый пост', texts)
+        self.assertNotIn('Не скопирован', texts)
+
+    def test_writer_reads_own_writes(self):
+        """After a write the client is pinned to the primary for a while"""
+        response = self.writer.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'})
+        self.assertEqual(
+            response.cookies[settings.REPLICA_PIN_COOKIE]['max-age'],
+            settings.REPLICA_PIN_SECONDS)
+        self.assertIn('Свежий пост', self.api_texts(self.writer))
+        self.assertNotIn('Свежий пост', self.api_texts(Client()))
+        # The window is over: back to the replica
+        self.writer.cookies[settings.REPLICA_PIN_COOKIE] = '0'
+        self.assertNotIn('Свежий пост', self.api_texts(self.writer))
+
+    def test_cached_pages_built_from_primary(self):
+        """Pages cached under new feed versions never hold lagging rows"""
+        reader = Client()
+        reader.force_login(self.author)
+        for client in (Client(), reader):
+            with self.subTest(anonymous=client is not reader):
+                self.assertContains(
+                    client.get(reverse('posts:index')), 'Не скопирован')
+        replicas.sync(REPLICA)
+        for client in (Client(), reader):
+            self.assertContains(
+                client.get(reverse('posts:index')), 'Не скопирован')
+
+    def test_search_reads_one_database(self):
+        """Full-text counts and pages come from the routed replica"""
+        self.assertEqual(fulltext.search('пост').count(), 1)
+        # Only on the primary: a count from there would promise a row
+        results = fulltext.search('скопирован')
+        self.assertEqual(results.count(), 0)
+        self.assertEqual(results[:10], [])
+        with replicas.primary():
+            results = fulltext.search('скопирован')
+            self.assertEqual(
+                [post.text for post in results[:10]], ['Не скопирован'])
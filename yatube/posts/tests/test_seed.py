@@ -0,0 +1,72 @@
+from django.core.management import call_command
+from django.db.models import Count, Sum
+from django.test import TestCase
+
+from io import StringIO
+
+from users.models import Profile
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+
+SIZES = {'users': 40, 'groups': 3, 'posts': 400, 'comments': 200,
+         'follows': 150}
+
+
+class SeedLoadTest(TestCase):
+    def seed(self, prefix, seed=1):
+        call_command(
+            'seed_load', prefix=prefix, seed=seed, batch_size=64,
+            stdout=StringIO(), **SIZES)
+
+    def dataset(self, prefix):
+        """Seeded rows without database ids"""
+        posts = Post.objects.filter(
+            author__username__startswith=prefix).order_by('pk')
+        return (
+            list(posts.values_list(
+                'author__username', 'group__slug', 'text', 'pub_date')),
+            sorted(Follow.objects.filter(
+                user__username__startswith=prefix).values_list(
+                'user__username', 'author__username')),
+        )
+
+    def test_creates_requested_volumes(self):
+        """Rows are created and counters are consistent"""
+        self.seed('load')
+        self.assertEqual(Profile.objects.count(), SIZES['users'])
+        self.assertEqual(Group.objects.count(), SIZES['groups'])
+        self.assertEqual(Post.objects.count(), SIZES['posts'])
+        self.assertEqual(Comment.objects.count(), SIZES['comments'])
+        self.assertLessEqual(Follow.objects.count(), SIZES['follows'])
+        self.assertEqual(
+            Profile.objects.aggregate(total=Sum('posts_count'))['total'],
+            SIZES['posts']
+        )
+        self.assertEqual(
+            Post.objects.aggregate(total=Sum('comments_count'))['total'],
+            SIZES['comments']
+        )
+        self.assertTrue(TimelineEntry.objects.exists())
+        for comment in Comment.objects.select_related('post')[:50]:
+            self.assertGreaterEqual(comment.created, comment.post.pub_date)
+
+    def test_author_popularity_is_skewed(self):
+        """A few authors write most of the posts"""
+        self.seed('load')
+        per_author = sorted(
+            Post.objects.order_by().values('author')
+            .annotate(total=Count('pk'))
+            .values_list('total', flat=True),
+            reverse=True
+        )
+        top = sum(per_author[:SIZES['users'] // 10])
+        self.assertGreater(top, SIZES['posts'] // 3)
+
+    def test_same_seed_same_dataset(self):
+        """Datasets of one seed differ only by the name prefix"""
+        self.seed('first')
+        self.seed('second')
+        first, second = self.dataset('first'), self.dataset('second')
+        self.assertTrue(first[0])
+        self.assertEqual(
+            repr(first).replace('first', 'second'), repr(second))
@@ -0,0 +1,53 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import slow_queries
+
+from ..models import Post
+
+
+@override_settings(SLOW_QUERY_MS=0)
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        slow_queries.reset()
+        self.addCleanup(slow_queries.reset)
+        slow_queries.install(None, connection)
+        self.addCleanup(
+            connection.execute_wrappers.remove, slow_queries.log_slow_query)
+
+    def test_logs_view_caller_and_plan(self):
+        """A slow query is logged with its view, call site and plan"""
+        with self.assertLogs('core.slow_queries', 'WARNING') as logs:
+            Client().get(
+                reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        record = next(
+            output for output in logs.output
+            if 'posts/views.py' in output and 'FROM "posts_post"' in output)
+        self.assertIn('in posts:post_detail at ', record)
+        self.assertIn(f'params: ({self.post.pk},', record)
+        self.assertRegex(record, r'plan:\n.*(SEARCH|SCAN)')
+
+    def test_repeated_patterns_rate_limited(self):
+        """One record per pattern per interval, IN lists of any length"""
+        with self.assertLogs('core.slow_queries', 'WARNING') as logs:
+            list(Post.objects.filter(pk__in=[1, 2]))
+            list(Post.objects.filter(pk__in=[1, 2, 3]))
+            list(User.objects.filter(pk=self.user.pk))
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('no request', logs.output[0])
+
+    def test_threshold(self):
+        """Queries faster than the threshold are not logged"""
+        with override_settings(SLOW_QUERY_MS=60 * 1000):
+            with self.assertRaises(AssertionError):
+                with self.assertLogs('core.slow_queries', 'WARNING'):
+                    list(Post.objects.all())
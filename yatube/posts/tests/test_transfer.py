@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from io import StringIO
+import json
+import shutil
+import tempfile
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class TransferTest(TestCase):
+    def setUp(self):
+        self.source_media = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.source_media, ignore_errors=True)
+        author = User.objects.create_user(username='Author')
+        reader = User.objects.create_user(username='Reader')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        with override_settings(MEDIA_ROOT=self.source_media):
+            self.post = Post.objects.create(
+                author=author, group=group, text='Пост с картинкой',
+                image=SimpleUploadedFile('small.gif', SMALL_GIF))
+        Post.objects.create(author=reader, text='Пост без группы')
+        Comment.objects.create(
+            post=self.post, author=reader, text='Комментарий')
+        Follow.objects.create(user=reader, author=author)
+
+    def export(self):
+        output = StringIO()
+        call_command('export_yatube', stdout=output)
+        return output.getvalue()
+
+    def import_dump(self, dump, **options):
+        with tempfile.NamedTemporaryFile(
+                'w', suffix='.jsonl', encoding='utf-8') as file:
+            file.write(dump)
+            file.flush()
+            call_command(
+                'import_yatube', file.name, stdout=StringIO(), **options)
+
+    def snapshot(self):
+        return (
+            sorted(Group.objects.values_list('slug', 'title')),
+            sorted(Post.objects.values_list(
+                'author__username', 'pub_date', 'text', 'group__slug',
+                'comments_count', 'author__profile__posts_count')),
+            sorted(Comment.objects.values_list(
+                'post__text', 'author__username', 'created', 'text')),
+            sorted(Follow.objects.values_list(
+                'user__username', 'author__username')),
+        )
+
+    def test_export_is_jsonl_in_dependency_order(self):
+        """Every line is a record, parents come before children"""
+        models = [json.loads(line)['model']
+                  for line in self.export().splitlines()]
+        self.assertEqual(
+            models, ['group', 'post', 'post', 'comment', 'follow'])
+
+    def test_round_trip(self):
+        """Import restores data, dates and counters on an empty database"""
+        dump = self.export()
+        before = self.snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root):
+            self.import_dump(
+                dump, batch_size=1, media_dir=self.source_media)
+            post = Post.objects.get(text='Пост с картинкой')
+            self.assertTrue(post.image.storage.exists(post.image.name))
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(post.image.name, self.post.image.name)
+        self.assertEqual(TimelineEntry.objects.count(), 1)
+
+    def test_repeated_import_skips_existing(self):
+        """Importing the same dump twice creates nothing new"""
+        dump = self.export()
+        before = self.snapshot()
+        self.import_dump(dump)
+        self.assertEqual(self.snapshot(), before)
+
+    def test_ambiguous_post_keys_fail(self):
+        """Posts sharing author and date can be neither exported nor loaded"""
+        lines = self.export().splitlines()
+        post = next(line for line in lines if '"post"' in line)
+        twin = json.loads(post)
+        twin['text'] = 'Другой пост'
+        dump = '\n'.join([post, json.dumps(twin, ensure_ascii=False)])
+        Post.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, 'Duplicate post key'):
+            self.import_dump(dump)
+        self.assertFalse(Post.objects.exists())
+        for text in ('Первый', 'Второй'):
+            Post.objects.create(author=self.post.author, text=text)
+        Post.objects.update(pub_date=self.post.pub_date)
+        with self.assertRaisesMessage(CommandError, 'share the key'):
+            self.export()
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase, Client
 
 from typing import NamedTuple
@@ -59,6 +60,7 @@ class PostUrlTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         #  not authorized
         self.guest_client = Client()
         #  authorized, w/o posts
@@ -80,13 +82,13 @@ class PostUrlTest(TestCase):
         for template, address in common_template_url_names:
             with self.subTest(address=address):
                 #  response for all types of users
-                guest_response = self.guest_client.get(address)
-                random_user_response = self.random_user_client.get(address)
-                author_response = self.author_user_client.get(address)
-
-                self.assertTemplateUsed(guest_response, template)
-                self.assertTemplateUsed(random_user_response, template)
-                self.assertTemplateUsed(author_response, template)
+                for client in (self.guest_client,
+                               self.random_user_client,
+                               self.author_user_client):
+                    # Later viewers would reuse the cached page shell
+                    cache.clear()
+                    response = client.get(address)
+                    self.assertTemplateUsed(response, template)
 
     def test_post_create_url_uses_template_or_redirect(self):
         """Check post create url.
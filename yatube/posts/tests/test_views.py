@@ -1,20 +1,42 @@
 from django.contrib.auth.models import User
-from django.test import Client, TestCase, override_settings
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
 from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
 from django.urls import reverse
 from django.conf import settings
 from django import forms
 
+from io import BytesIO, StringIO
 from typing import NamedTuple
+import os
 import shutil
 import tempfile
 
-from ..models import Follow, Group, Post
+from PIL import Image
+
+from users.models import Profile
+
+from .. import feed_cache, fulltext, thumbnails, timeline
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+from ..pagination import CursorPaginator
 from ..forms import PostForm
+from .utils import QueryBudgetMixin
 
 # For temp images
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 
 
 class TemplateReverseName(NamedTuple):
@@ -92,6 +114,7 @@ class PostViewsTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
         # Tuple with all pages
@@ -248,6 +271,7 @@ class PostCreationTest(TestCase):
         cls.POST_ID = cls.post.id
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -303,12 +327,14 @@ class PostWithImageTest(TestCase):
             content=cls.small_gif,
             content_type='image/gif'
         )
-        Post.objects.create(
+        post = Post.objects.create(
             author=cls.user,
             text='Test text',
             group=cls.group,
             image=uploaded
         )
+        # Stored under the hash of its content
+        cls.IMAGE_NAME = post.image.name
         cls.FIRST_POST_ID = Post.objects.first().id
         cls.POST_DETAIL_PAGE = TemplateReverseName(
             'posts/post_detail.html',
@@ -337,7 +363,7 @@ class PostWithImageTest(TestCase):
             response = self.authorized_client.get(page.reverse_name)
             post = response.context['page_obj'][0]
             post_image = post.image
-            self.assertEqual(post_image, 'posts/small.gif')
+            self.assertEqual(post_image, self.IMAGE_NAME)
 
     def test_post_detail_with_image_page_show_correct_context(self):
         """post detail with image using correct context"""
@@ -345,7 +371,89 @@ class PostWithImageTest(TestCase):
             self.POST_DETAIL_PAGE.reverse_name)
         detail_post = response.context.get('post')
         detail_post_image = detail_post.image
-        self.assertEqual(detail_post_image, 'posts/small.gif')
+        self.assertEqual(detail_post_image, self.IMAGE_NAME)
+        self.assertRegex(self.IMAGE_NAME, r'^posts/\w{2}/\w{64}\.gif$')
+
+
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_NAME)
+
+    def setUp(self):
+        # Own media root per test to count generated thumbnail files
+        media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        # Same content gets the same name: drop sorl's cached thumbnails
+        cache.clear()
+
+    def create_post(self, name, content=SMALL_GIF):
+        return Post.objects.create(
+            author=self.user,
+            text='Test text',
+            image=SimpleUploadedFile(
+                name=name, content=content, content_type='image/gif')
+        )
+
+    def thumbnail_files(self):
+        cache_dir = os.path.join(settings.MEDIA_ROOT, 'cache')
+        return sum(len(files) for _, _, files in os.walk(cache_dir))
+
+    def test_submit_generates_every_geometry(self):
+        """Queued post image gets thumbnails for all template geometries"""
+        post = self.create_post('queued.gif')
+        thumbnails.submit(post.image.name)
+        self.assertEqual(self.thumbnail_files(), len(thumbnails.GEOMETRIES))
+
+    def test_duplicate_upload_reuses_thumbnails(self):
+        """Posts with the same image share its thumbnails"""
+        for name in ('first.gif', 'second.gif'):
+            post = self.create_post(name)
+            thumbnails.submit(post.image.name)
+        self.assertEqual(self.thumbnail_files(), len(thumbnails.GEOMETRIES))
+
+    def test_responsive_image_tag(self):
+        """Feed image gets srcset, stored dimensions and lazy loading"""
+        file = BytesIO()
+        Image.new('RGB', (1200, 800)).save(file, 'JPEG')
+        post = Post.objects.create(
+            author=self.user,
+            text='Test text',
+            image=SimpleUploadedFile('wide.jpg', file.getvalue()),
+        )
+        self.assertEqual((post.image_width, post.image_height), (1200, 800))
+        html = Template(
+            '{% load post_images %}'
+            '{% responsive_image post.image "960x339" crop="center" %}'
+        ).render(Context({'post': post}))
+        for width in (*settings.THUMBNAIL_SRCSET_WIDTHS, 960):
+            self.assertIn(f' {width}w', html)
+        self.assertIn('width="960" height="339"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('sizes="(max-width: 960px) 100vw, 960px"', html)
+
+    def test_srcset_skips_widths_wider_than_image(self):
+        """Narrow originals do not get useless wide srcset candidates"""
+        self.assertEqual(
+            thumbnails.srcset_geometries('960x339', max_width=400),
+            ['360x127', '960x339']
+        )
+
+    def test_backfill_command(self):
+        """generate_thumbnails covers already uploaded images"""
+        for i in range(3):
+            file = BytesIO()
+            Image.new('RGB', (2, 1), (i, i, i)).save(file, 'GIF')
+            self.create_post(f'old{i}.gif', file.getvalue())
+        output = StringIO()
+        call_command('generate_thumbnails', workers=0, stdout=output)
+        self.assertIn('Обработано картинок: 3, ошибок: 0', output.getvalue())
+        self.assertEqual(
+            self.thumbnail_files(), 3 * len(thumbnails.GEOMETRIES))
 
 
 class CacheTest(TestCase):
@@ -363,26 +471,133 @@ class CacheTest(TestCase):
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
+        cache.clear()
 
     def test_index_page_cache(self):
-        """Deleted post should be kept in cache until cache is cleared"""
-        post = Post.objects.get(pk=self.POST_ID)
-        response_before_delete = self.guest_client.get(
-            INDEX_PAGE.reverse_name)
-        post.delete()
-        # save content after post delete for test
-        response_after_delete = self.guest_client.get(
-            INDEX_PAGE.reverse_name)
-        self.assertEqual(
-            response_before_delete.content,
-            response_after_delete.content
-        )
+        """Index fragment is cached while the feed does not change"""
+        response_before = self.guest_client.get(INDEX_PAGE.reverse_name)
+        # Bypass signals: cached fragment must survive a silent change
+        Post.objects.filter(pk=self.POST_ID).update(text='Changed text')
+        response_after = self.guest_client.get(INDEX_PAGE.reverse_name)
+        self.assertEqual(response_before.content, response_after.content)
         cache.clear()
         response_cache_cleared = self.guest_client.get(
             INDEX_PAGE.reverse_name)
-        self.assertNotEqual(
-            response_after_delete.content,
-            response_cache_cleared.content
+        self.assertContains(response_cache_cleared, 'Changed text')
+
+    def test_post_delete_invalidates_feeds(self):
+        """Deleted post disappears from cached feeds at once"""
+        pages = (INDEX_PAGE.reverse_name, PROFILE_PAGE.reverse_name)
+        for page in pages:
+            self.assertContains(self.guest_client.get(page), 'Test text')
+        Post.objects.get(pk=self.POST_ID).delete()
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertNotContains(
+                    self.guest_client.get(page), 'Test text')
+
+    def test_post_create_invalidates_feeds(self):
+        """New post shows up in cached feeds at once"""
+        self.guest_client.get(INDEX_PAGE.reverse_name)
+        self.authorized_client.post(
+            POST_CREATE_PAGE.reverse_name, {'text': 'Brand new post'})
+        response = self.guest_client.get(INDEX_PAGE.reverse_name)
+        self.assertContains(response, 'Brand new post')
+
+    def test_feed_pages_cached_separately(self):
+        """Every page of the feed has its own cached fragment"""
+        for i in range(POSTS_PER_PAGE):
+            Post.objects.create(author=self.user, text=f'Newer post {i}')
+        first_page = self.guest_client.get(INDEX_PAGE.reverse_name)
+        second_page = self.guest_client.get(
+            INDEX_PAGE.reverse_name + '?page=2')
+        self.assertNotContains(first_page, 'Test text')
+        self.assertContains(second_page, 'Test text')
+
+    def test_workers_need_shared_cache(self):
+        """Several workers refuse to start with a per-process cache"""
+        with override_settings(WEB_CONCURRENCY=2):
+            with self.assertRaises(ImproperlyConfigured):
+                feed_cache.check_shared_cache()
+        with override_settings(WEB_CONCURRENCY=2, CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': TEMP_MEDIA_ROOT,
+        }}):
+            feed_cache.check_shared_cache()
+        feed_cache.check_shared_cache()
+
+
+class ConditionalGetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_NAME)
+        cls.reader = User.objects.create_user(username='Reader')
+        group = Group.objects.create(
+            title='Test group', slug=FIRST_GROUP_SLUG, description='-')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Test text', group=group)
+        cls.POST_DETAIL_URL = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.pk})
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        cache.clear()
+
+    def assertNotModified(self, client, url, etag):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_unchanged_feeds_not_modified(self):
+        """Repeated GET with the same ETag gets 304 without rendering"""
+        urls = (
+            INDEX_PAGE.reverse_name,
+            FIRST_GROUP_PAGE.reverse_name,
+            PROFILE_PAGE.reverse_name,
+            self.POST_DETAIL_URL,
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.authorized_client.get(url)['ETag']
+                # Session, user and the ETag lookup at most
+                with self.assertMaxQueries(3):
+                    self.assertNotModified(self.authorized_client, url, etag)
+
+    def test_changes_update_etag(self):
+        """New posts, comments and follows change the ETag"""
+        changes = (
+            (INDEX_PAGE.reverse_name, lambda: Post.objects.create(
+                author=self.user, text='New post')),
+            (self.POST_DETAIL_URL, lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Comment')),
+            (PROFILE_PAGE.reverse_name, lambda: Follow.objects.create(
+                user=self.reader, author=self.user)),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.authorized_client.get(url)['ETag']
+                change()
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_viewer_and_page(self):
+        """Pages of other viewers and other pages are not reused"""
+        url = INDEX_PAGE.reverse_name
+        etag = self.authorized_client.get(url)['ETag']
+        self.assertEqual(
+            self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200
+        )
+        self.assertEqual(
+            self.authorized_client.get(
+                url, {'page': 2}, HTTP_IF_NONE_MATCH=etag).status_code,
+            200
         )
 
 
@@ -474,3 +689,366 @@ class FollowTest(TestCase):
             self.FOLLOW_INDEX_PAGE)
         not_follower_index = not_follower_response.context['page_obj']
         self.assertFalse(not_follower_index)
+
+
+class CursorPaginationTest(TestCase):
+    POSTS_COUNT = 23
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_NAME)
+        # Posts created in a loop may share pub_date, pk breaks the tie
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Test text {i}')
+            for i in range(cls.POSTS_COUNT)
+        )
+        cls.expected_ids = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def get_page(self, **params):
+        response = self.guest_client.get(INDEX_PAGE.reverse_name, params)
+        return response.context['page_obj']
+
+    def test_cursor_walks_feed_forward_and_back(self):
+        """after/before cursors walk the whole feed without gaps"""
+        with self.settings(POSTS_PAGINATION_MODE='cursor'):
+            first_page = self.get_page()
+        self.assertTrue(first_page.is_cursor)
+        self.assertFalse(first_page.has_previous())
+        seen = [post.pk for post in first_page]
+        page_obj = first_page
+        while page_obj.has_next():
+            page_obj = self.get_page(after=page_obj.next_cursor)
+            seen += [post.pk for post in page_obj]
+        self.assertEqual(seen, self.expected_ids)
+        self.assertEqual(
+            len(page_obj), self.POSTS_COUNT % POSTS_PER_PAGE)
+        previous_page = self.get_page(before=page_obj.previous_cursor)
+        self.assertEqual(
+            [post.pk for post in previous_page],
+            self.expected_ids[POSTS_PER_PAGE:2 * POSTS_PER_PAGE]
+        )
+        self.assertTrue(previous_page.has_previous())
+
+    def test_cursor_flags_come_from_data(self):
+        """has_next/has_previous reflect rows beyond the page edges"""
+        paginator = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE)
+        second = paginator.page(after=paginator.page().next_cursor)
+        first = paginator.page(before=second.previous_cursor)
+        self.assertFalse(first.has_previous())
+        self.assertTrue(first.has_next())
+        newest = Post.objects.get(pk=self.expected_ids[0])
+        empty = paginator.page(before=paginator.cursor_for(newest))
+        self.assertEqual((empty.has_previous(), empty.has_next()),
+                         (False, True))
+        Post.objects.filter(
+            pk__in=self.expected_ids[POSTS_PER_PAGE:]).delete()
+        first = paginator.page(before=second.next_cursor)
+        self.assertFalse(first.has_next())
+        oldest = paginator.page(after=second.next_cursor)
+        self.assertEqual((oldest.has_previous(), oldest.has_next()),
+                         (True, False))
+
+    def test_cursor_links_in_paginator(self):
+        """Cursor page renders next link instead of page numbers"""
+        response = self.guest_client.get(
+            INDEX_PAGE.reverse_name, {'after': ''})
+        page_obj = response.context['page_obj']
+        self.assertContains(response, f'?after={page_obj.next_cursor}')
+        self.assertNotContains(response, '?page=2')
+
+    def test_invalid_cursor_opens_first_page(self):
+        """Broken cursor token falls back to the first page"""
+        page_obj = self.get_page(after='not-a-cursor')
+        self.assertEqual(
+            [post.pk for post in page_obj],
+            self.expected_ids[:POSTS_PER_PAGE]
+        )
+
+    def test_page_mode_still_available(self):
+        """?page= keeps classic paginator even in cursor mode"""
+        with self.settings(POSTS_PAGINATION_MODE='cursor'):
+            page_obj = self.get_page(page=3)
+        self.assertEqual(page_obj.number, 3)
+        self.assertEqual(page_obj.paginator.count, self.POSTS_COUNT)
+
+
+class CommentPaginationTest(TestCase):
+    COMMENTS_COUNT = 45
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_NAME)
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(cls.COMMENTS_COUNT)
+        )
+        cls.expected_ids = list(
+            Comment.objects.order_by('-created', '-pk')
+            .values_list('pk', flat=True)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_post_detail_renders_first_batch(self):
+        """Only the newest comments are rendered with the post"""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.pk for comment in comments],
+            self.expected_ids[:settings.COMMENTS_PER_PAGE]
+        )
+        self.assertContains(
+            response,
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+            + f'?after={comments.next_cursor}'
+        )
+
+    def test_fragments_load_remaining_comments(self):
+        """Fragments walk every comment once and end without a link"""
+        seen = []
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        params = {}
+        while True:
+            response = self.guest_client.get(url, params)
+            comments = response.context['comments']
+            seen += [comment.pk for comment in comments]
+            if not comments.has_next():
+                break
+            url = reverse(
+                'posts:post_comments', kwargs={'post_id': self.post.pk})
+            params = {'after': comments.next_cursor}
+        self.assertEqual(seen, self.expected_ids)
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'data-comments-url')
+
+    def test_fragment_of_missing_post(self):
+        """Comments of a missing post are 404"""
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 10 ** 6}))
+        self.assertEqual(response.status_code, 404)
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.follower = User.objects.create_user(username='Follower')
+        cls.old_post = Post.objects.create(author=cls.author, text='Old')
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def get_follow_feed(self):
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_follow_fills_timeline_with_old_posts(self):
+        """Follow backfills author's existing posts"""
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=self.old_post).exists())
+
+    def test_post_create_fans_out(self):
+        """New post lands in follower timeline"""
+        self.author_client.post(
+            POST_CREATE_PAGE.reverse_name, {'text': 'Fresh post'})
+        post = Post.objects.get(text='Fresh post')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=post).exists())
+        self.assertEqual(self.get_follow_feed()[0], post.pk)
+
+    def test_unfollow_and_delete_clear_timeline(self):
+        """Unfollow and post delete remove timeline rows"""
+        self.old_post.delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+        Post.objects.create(author=self.author, text='Another')
+        self.follower_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'Author'}))
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.get_follow_feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_large_author_merged_at_read_time(self):
+        """Large authors skip fan-out but still appear in follow feed"""
+        post = Post.objects.create(author=self.author, text='Celebrity')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(
+            self.get_follow_feed(), [post.pk, self.old_post.pk])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_author_below_limit_backfilled(self):
+        """Posts made while an author was large survive an unfollow"""
+        other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(author=self.author, text='Large')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertTrue(Profile.objects.get(user=self.author).fanout_skipped)
+        Follow.objects.get(user=other).delete()
+        call_command('backfill_timelines', stdout=StringIO())
+        self.assertTrue(TimelineEntry.objects.filter(post=post).exists())
+        self.assertFalse(Profile.objects.get(user=self.author).fanout_skipped)
+        self.assertEqual(
+            self.get_follow_feed(), [post.pk, self.old_post.pk])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_backfill_waits_while_author_large(self):
+        """Authors still at the limit stay merged at read time"""
+        large = Post.objects.create(author=self.author, text='Large')
+        with override_settings(TIMELINE_FANOUT_LIMIT=2):
+            self.assertEqual(timeline.backfill_pending(), 1)
+        self.assertTrue(TimelineEntry.objects.filter(post=large).exists())
+        again = Post.objects.create(author=self.author, text='Again')
+        self.assertEqual(timeline.backfill_pending(), 0)
+        self.assertFalse(TimelineEntry.objects.filter(post=again).exists())
+        self.assertEqual(
+            self.get_follow_feed(), [again.pk, large.pk, self.old_post.pk])
+
+    def test_rebuild_timelines_command(self):
+        """rebuild_timelines restores timelines from Follow"""
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.get_follow_feed(), [self.old_post.pk])
+
+
+class TimelineBackfillTest(TransactionTestCase):
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_unfollow_backfills_after_commit(self):
+        """Dropping below the limit backfills once the unfollow commits"""
+        author = User.objects.create_user(username='Author')
+        follower = User.objects.create_user(username='Follower')
+        other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=follower, author=author)
+        Follow.objects.create(user=other, author=author)
+        post = Post.objects.create(author=author, text='Large')
+        client = Client()
+        client.force_login(other)
+        client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'Author'}))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=follower, post=post).exists())
+        self.assertFalse(Profile.objects.get(user=author).fanout_skipped)
+
+
+class SearchTest(TestCase):
+    SEARCH_PAGE = reverse('posts:search')
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_NAME)
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug=FIRST_GROUP_SLUG,
+            description='Test description'
+        )
+        cls.weak = Post.objects.create(
+            author=cls.user,
+            text='Длинный пост про разное, где котик упомянут один раз',
+        )
+        cls.strong = Post.objects.create(
+            author=cls.other, text='Котик и ещё раз котик', group=cls.group)
+        cls.commented = Post.objects.create(author=cls.other, text='Собака')
+        Comment.objects.create(
+            post=cls.commented, author=cls.user, text='Какой КОТИК!')
+        Post.objects.create(author=cls.user, text='Ничего общего')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, **params):
+        response = self.guest_client.get(self.SEARCH_PAGE, params)
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_search_ranks_posts_and_comments(self):
+        """Search finds posts by text and comments ranked by BM25"""
+        found = self.search(q='котик')
+        self.assertEqual(found[0], self.strong.pk)
+        self.assertCountEqual(
+            found, [self.strong.pk, self.weak.pk, self.commented.pk])
+
+    def test_search_filters(self):
+        """Search can be limited by group and author"""
+        self.assertEqual(
+            self.search(q='котик', group=FIRST_GROUP_SLUG),
+            [self.strong.pk])
+        self.assertCountEqual(
+            self.search(q='котик', author='Other'),
+            [self.strong.pk, self.commented.pk])
+
+    def test_search_syntax_is_escaped(self):
+        """FTS operators in user input do not break the query"""
+        self.assertEqual(self.search(q='котик" OR (NEAR'), [])
+        response = self.guest_client.get(self.SEARCH_PAGE)
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_search_index_follows_edits(self):
+        """Edited and deleted posts update the index"""
+        Post.objects.filter(pk=self.strong.pk).update(text='Попугай')
+        Post.objects.get(pk=self.commented.pk).delete()
+        self.assertEqual(self.search(q='котик'), [self.weak.pk])
+        self.assertEqual(self.search(q='попугай'), [self.strong.pk])
+
+    def test_lost_triggers_restored(self):
+        """ensure_index brings back triggers dropped by a table rebuild"""
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER posts_post_fts_ai')
+        fulltext.ensure_index()
+        post = Post.objects.create(author=self.user, text='Жираф')
+        self.assertEqual(self.search(q='жираф'), [post.pk])
+
+    def test_search_pagination_keeps_query(self):
+        """Paginator links keep search parameters"""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Котик номер {i}')
+            for i in range(POSTS_PER_PAGE)
+        )
+        response = self.guest_client.get(self.SEARCH_PAGE, {'q': 'котик'})
+        self.assertContains(
+            response, '?q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA&amp;page=2')
+        self.assertEqual(len(self.search(q='котик', page=2)), 3)
+
+    def test_admin_search_uses_index(self):
+        """Admin post search goes through the full-text index"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.guest_client.force_login(admin)
+        response = self.guest_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'котик'})
+        self.assertCountEqual(
+            [post.pk for post in response.context['cl'].result_list],
+            [self.strong.pk, self.weak.pk])
+
+    def test_admin_comment_search_by_author(self):
+        """Admin comment search matches text and commenter username"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.guest_client.force_login(admin)
+        commenter = User.objects.create_user(username='commenter')
+        by_name = Comment.objects.create(
+            post=self.strong, author=commenter, text='Без слова')
+        by_text = Comment.objects.create(
+            post=self.strong, author=self.user, text='Про commenter')
+        response = self.guest_client.get(
+            reverse('admin:posts_comment_changelist'), {'q': 'commenter'})
+        self.assertCountEqual(
+            [comment.pk for comment in response.context['cl'].result_list],
+            [by_name.pk, by_text.pk])
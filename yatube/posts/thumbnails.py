@@ -0,0 +1,120 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.helpers import toint
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.parsers import parse_geometry
+
+from .models import post_storage
+
+logger = logging.getLogger(__name__)
+
+FEED_GEOMETRY = '960x339'
+FEED_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def srcset_geometries(geometry, ratio=None, max_width=None):
+    """
+    Геометрии sorl для srcset: ширины THUMBNAIL_SRCSET_WIDTHS меньше
+    исходной (но не шире картинки max_width) и сама geometry последней.
+    """
+    width, height = parse_geometry(geometry, ratio)
+    widths = [w for w in settings.THUMBNAIL_SRCSET_WIDTHS if w < width]
+    if max_width is not None:
+        widths = [w for w in widths if w <= max_width] or widths[:1]
+    geometries = []
+    for candidate in widths:
+        if height is None:
+            geometries.append(str(candidate))
+        else:
+            scaled = toint(height * candidate / width)
+            geometries.append(f'{candidate}x{scaled}')
+    geometries.append(geometry)
+    return geometries
+
+
+# Every geometry used by templates, with the same options, so that
+# pre-generated thumbnails hit sorl's key-value store
+GEOMETRIES = tuple(
+    (geometry, FEED_OPTIONS) for geometry in srcset_geometries(FEED_GEOMETRY)
+)
+
+_executor = None
+
+
+def generate(name):
+    """Создает все миниатюры картинки name, возвращает их число."""
+    # sorl keys thumbnails by storage too: use the one templates see
+    image = ImageFile(name, post_storage)
+    for geometry, options in GEOMETRIES:
+        get_thumbnail(image, geometry, **options)
+    return len(GEOMETRIES)
+
+
+def generate_many(names):
+    """Пачка для процесса-воркера: возвращает [(name, ошибка), ...]."""
+    failures = []
+    for name in names:
+        try:
+            generate(name)
+        except Exception as error:
+            failures.append((name, str(error)))
+    return failures
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def _log_failure(name):
+    def callback(future):
+        error = future.exception()
+        if error is not None:
+            logger.error(
+                'Thumbnail generation failed for %s', name, exc_info=error)
+    return callback
+
+
+def create_executor(workers):
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        # spawn: children must not share the parent's DB connections
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker,
+    )
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = create_executor(settings.THUMBNAIL_WORKERS)
+    return _executor
+
+
+def runs_inline():
+    # Worker processes can't see an in-memory (test) database
+    in_memory = getattr(connection, 'is_in_memory_db', lambda: False)
+    return not settings.THUMBNAIL_WORKERS or in_memory()
+
+
+def submit(name):
+    if runs_inline():
+        try:
+            generate(name)
+        except Exception:
+            logger.exception('Thumbnail generation failed for %s', name)
+        return
+    future = get_executor().submit(generate, name)
+    future.add_done_callback(_log_failure(name))
+
+
+def queue(post):
+    """Ставит генерацию миниатюр поста в очередь после коммита."""
+    if post.image:
+        name = post.image.name
+        transaction.on_commit(lambda: submit(name))
@@ -0,0 +1,224 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from users.models import Profile
+
+from .models import Follow, Post, TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+REBUILD_SQL = """
+    INSERT INTO {entries} (user_id, post_id)
+    SELECT follow.user_id, post.id
+    FROM {follows} follow
+    JOIN {posts} post ON post.author_id = follow.author_id
+    WHERE follow.id > %s AND follow.id <= %s
+        AND follow.author_id NOT IN ({large})
+"""
+
+
+def insert_batch_size(batch_size=BATCH_SIZE):
+    # SQLite limits terms of a multi-row INSERT, Django doesn't cap
+    # an explicit batch_size
+    limit = connection.ops.bulk_batch_size(('user_id', 'post_id'), ())
+    return min(batch_size, limit)
+
+
+def fanout_limit():
+    return settings.TIMELINE_FANOUT_LIMIT
+
+
+def large_authors():
+    """Авторы с огромным числом подписчиков не раскладываются по лентам."""
+    return Profile.objects.filter(
+        followers_count__gte=fanout_limit()
+    ).values('user')
+
+
+def is_large_author(author_id):
+    return large_authors().filter(user_id=author_id).exists()
+
+
+def large_authors_followed_by(user):
+    return Follow.objects.filter(
+        user=user,
+        author__in=large_authors()
+    ).values('author')
+
+
+def mark_skipped(author_id):
+    """Запоминает, что посты автора есть не во всех лентах подписчиков."""
+    Profile.objects.filter(
+        user_id=author_id, fanout_skipped=False
+    ).update(fanout_skipped=True)
+
+
+def fan_out(post):
+    """Кладет новый пост в ленты всех подписчиков автора."""
+    if is_large_author(post.author_id):
+        mark_skipped(post.author_id)
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post) for user_id in followers),
+        batch_size=insert_batch_size(),
+        ignore_conflicts=True,
+    )
+
+
+def add_author(user_id, author_id):
+    """Заполняет ленту подписчика уже опубликованными постами автора."""
+    if is_large_author(author_id):
+        mark_skipped(author_id)
+        return
+    post_ids = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=pk) for pk in post_ids),
+        batch_size=insert_batch_size(),
+        ignore_conflicts=True,
+    )
+
+
+def pending_authors():
+    """Авторы, которые стали обычными, но ленты по ним не дозаполнены."""
+    return Profile.objects.filter(
+        fanout_skipped=True,
+        followers_count__lt=fanout_limit(),
+    ).values_list('user_id', flat=True)
+
+
+def backfill(author_id):
+    """
+    Раскладывает посты автора, который снова стал обычным.
+
+    Пока автор был крупным, его посты брались слиянием при чтении;
+    без дозаполнения они пропали бы из лент подписчиков. Возвращает
+    True, если автор был в ожидании.
+    """
+    with transaction.atomic():
+        # The row lock serializes backfills with each other and with
+        # follows of the author; a large author again is left flagged
+        pending = Profile.objects.select_for_update().filter(
+            user_id=author_id, fanout_skipped=True,
+            followers_count__lt=fanout_limit(),
+        ).exists()
+        if not pending:
+            return False
+        followers = Follow.objects.filter(
+            author_id=author_id).values_list('user_id', flat=True)
+        for user_id in followers.iterator():
+            add_author(user_id, author_id)
+        Profile.objects.filter(user_id=author_id).update(
+            fanout_skipped=False)
+    return True
+
+
+def backfill_pending():
+    """Дозаполняет ленты по всем ожидающим авторам, возвращает их число."""
+    return sum(backfill(author_id) for author_id in pending_authors())
+
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # One thread: backfills are rare and must not compete with requests
+        _executor = ThreadPoolExecutor(max_workers=1)
+    return _executor
+
+
+def runs_inline():
+    # Other threads can't see an in-memory (test) database
+    in_memory = getattr(connection, 'is_in_memory_db', lambda: False)
+    return in_memory()
+
+
+def run_backfill(author_id):
+    try:
+        backfill(author_id)
+    except Exception:
+        logger.exception('Timeline backfill failed for author %s', author_id)
+    finally:
+        if not runs_inline():
+            connection.close()
+
+
+def author_unfollowed(author_id):
+    """
+    Ставит дозаполнение лент автора в очередь после коммита отписки.
+
+    Запрос не ждет ни проверки, ни раскладки: их делает фоновый поток,
+    а потерянное при перезапуске подбирает backfill_timelines.
+    """
+    def submit():
+        if runs_inline():
+            run_backfill(author_id)
+        else:
+            get_executor().submit(run_backfill, author_id)
+
+    transaction.on_commit(submit)
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id
+    ).delete()
+
+
+def posts_for(user):
+    """Посты ленты подписок: материализованные + крупные авторы."""
+    materialized = TimelineEntry.objects.filter(user=user).values('post')
+    return Post.objects.filter(
+        Q(pk__in=materialized)
+        | Q(author__in=large_authors_followed_by(user))
+    )
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """
+    Пересобирает все ленты по таблице Follow, возвращает число записей.
+
+    Записи вставляются одним INSERT ... SELECT на пачку из batch_size
+    подписок, без загрузки постов в Python. Пропуски раскладки после
+    пересборки есть ровно у крупных авторов.
+    """
+    TimelineEntry.objects.all().delete()
+    Profile.objects.update(fanout_skipped=False)
+    Profile.objects.filter(
+        followers_count__gte=fanout_limit()
+    ).update(fanout_skipped=True)
+    follows = Follow.objects.exclude(author__in=large_authors())
+    large_sql, large_params = large_authors().query.sql_with_params()
+    sql = REBUILD_SQL.format(
+        entries=TimelineEntry._meta.db_table,
+        follows=Follow._meta.db_table,
+        posts=Post._meta.db_table,
+        large=large_sql,
+    )
+    created = 0
+    last_pk = 0
+    with connection.cursor() as cursor:
+        while True:
+            chunk = list(
+                follows.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not chunk:
+                return created
+            cursor.execute(sql, [last_pk, chunk[-1], *large_params])
+            created += cursor.rowcount
+            last_pk = chunk[-1]
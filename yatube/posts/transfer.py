@@ -0,0 +1,346 @@
+import json
+import logging
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import groupby, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Count
+from django.utils.dateparse import parse_datetime
+
+from users.models import Profile
+
+from . import counters, feed_cache, stored_files, timeline
+from .models import Comment, Follow, Group, Post, User, post_storage
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+GROUP = 'group'
+POST = 'post'
+COMMENT = 'comment'
+FOLLOW = 'follow'
+
+
+def encode(value):
+    if isinstance(value, datetime):
+        # Full precision: dates are part of natural keys
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def write_jsonl(records, stream):
+    """Пишет записи по одной строке JSON, возвращает их число."""
+    total = 0
+    for record in records:
+        line = json.dumps(record, ensure_ascii=False, default=encode)
+        stream.write(line + '\n')
+        total += 1
+    return total
+
+
+def read_jsonl(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def ambiguous_post_keys():
+    """(автор, дата), общие для нескольких постов."""
+    return Post.objects.values('author__username', 'pub_date').annotate(
+        posts=Count('pk')
+    ).filter(posts__gt=1).order_by('author__username', 'pub_date')
+
+
+def check_post_keys():
+    ambiguous = ambiguous_post_keys().first()
+    if ambiguous is not None:
+        raise ValueError(
+            f'Posts share the key {ambiguous["author__username"]}, '
+            f'{ambiguous["pub_date"].isoformat()}: '
+            f'comments can not be matched to them')
+
+
+def export_records(batch_size=BATCH_SIZE):
+    """
+    Записи для выгрузки: группы, посты, комментарии, подписки.
+
+    Внешние ключи заменены естественными: username, slug и
+    (автор, дата) для поста; если ключ поста не уникален, выгрузка
+    падает до первой записи. Таблицы читаются итераторами по пачкам.
+    """
+    check_post_keys()
+    groups = Group.objects.order_by('pk').values_list(
+        'slug', 'title', 'description')
+    for slug, title, description in groups.iterator(chunk_size=batch_size):
+        yield {
+            'model': GROUP,
+            'slug': slug,
+            'title': title,
+            'description': description,
+        }
+    posts = Post.objects.order_by('pk').values_list(
+        'author__username', 'pub_date', 'text', 'group__slug',
+        'image', 'compact_image', 'image_width', 'image_height')
+    for row in posts.iterator(chunk_size=batch_size):
+        author, pub_date, text, group, image, compact, width, height = row
+        yield {
+            'model': POST,
+            'author': author,
+            'pub_date': pub_date,
+            'text': text,
+            'group': group,
+            'image': image,
+            'compact_image': compact,
+            'image_width': width,
+            'image_height': height,
+        }
+    comments = Comment.objects.order_by('pk').values_list(
+        'post__author__username', 'post__pub_date',
+        'author__username', 'created', 'text')
+    for row in comments.iterator(chunk_size=batch_size):
+        post_author, post_date, author, created, text = row
+        yield {
+            'model': COMMENT,
+            'post': [post_author, post_date],
+            'author': author,
+            'created': created,
+            'text': text,
+        }
+    follows = Follow.objects.order_by('pk').values_list(
+        'user__username', 'author__username')
+    for user, author in follows.iterator(chunk_size=batch_size):
+        yield {'model': FOLLOW, 'user': user, 'author': author}
+
+
+def batches(records, batch_size):
+    """Пачки подряд идущих записей одной модели."""
+    for model, group in groupby(records, key=lambda record: record['model']):
+        while True:
+            batch = list(islice(group, batch_size))
+            if not batch:
+                break
+            yield model, batch
+
+
+@contextmanager
+def keep_dates():
+    """auto_now_add перезаписал бы даты из выгрузки в bulk_create."""
+    fields = (
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    )
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def rebuild_derived(batch_size=BATCH_SIZE):
+    """Пересчет всего, что обычно поддерживают сигналы, после bulk_create."""
+    counters.recount()
+    stored_files.recount()
+    timeline.rebuild(batch_size)
+
+
+class Importer:
+    """
+    Загрузка выгрузки пачками bulk_create.
+
+    Ссылки разрешаются запросом на пачку, поэтому память не зависит
+    от размера выгрузки. Уже существующие объекты пропускаются.
+    Сигналы не срабатывают: счетчики, ленты и ссылки на файлы
+    пересчитываются в finish().
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, media_dir=None):
+        self.batch_size = batch_size
+        self.media_dir = media_dir
+        self.created = {GROUP: 0, POST: 0, COMMENT: 0, FOLLOW: 0}
+        self.loaders = {
+            GROUP: self.load_groups,
+            POST: self.load_posts,
+            COMMENT: self.load_comments,
+            FOLLOW: self.load_follows,
+        }
+
+    def run(self, records):
+        with keep_dates():
+            for model, batch in batches(records, self.batch_size):
+                if model not in self.loaders:
+                    raise ValueError(f'Unknown model: {model}')
+                with transaction.atomic():
+                    self.created[model] += self.loaders[model](batch)
+        with transaction.atomic():
+            self.finish()
+        return self.created
+
+    def users(self, usernames):
+        """{username: pk}; недостающие пользователи создаются без пароля."""
+        usernames = set(usernames)
+        found = dict(User.objects.filter(
+            username__in=usernames).values_list('username', 'pk'))
+        missing = usernames - set(found)
+        if missing:
+            User.objects.bulk_create(
+                User(username=name, password=make_password(None))
+                for name in missing
+            )
+            created = dict(User.objects.filter(
+                username__in=missing).values_list('username', 'pk'))
+            # bulk_create skips the signal that creates profiles
+            Profile.objects.bulk_create(
+                Profile(user_id=pk) for pk in created.values())
+            found.update(created)
+        return found
+
+    def groups(self, slugs):
+        return dict(Group.objects.filter(
+            slug__in=set(slugs)).values_list('slug', 'pk'))
+
+    def posts(self, keys):
+        """{(username, pub_date): pk} для естественных ключей постов."""
+        rows = Post.objects.filter(
+            pub_date__in={pub_date for _, pub_date in keys}
+        ).values_list('author__username', 'pub_date', 'pk')
+        found = {}
+        for author, pub_date, pk in rows:
+            key = (author, pub_date)
+            if key in found:
+                raise ValueError(f'Several posts match the key {key}')
+            found[key] = pk
+        return found
+
+    def media(self, name, field='image'):
+        """Копирует файл из media_dir в хранилище, возвращает новое имя."""
+        if not name or self.media_dir is None:
+            return name or ''
+        path = os.path.join(self.media_dir, name)
+        # upload_to of the field, the storage adds the content hash
+        target = Post._meta.get_field(field).generate_filename(
+            None, os.path.basename(name))
+        try:
+            with open(path, 'rb') as file:
+                return post_storage.save(target, File(file))
+        except OSError:
+            logger.warning('Image %s is missing, post imported without it',
+                           path)
+            return ''
+
+    def load_groups(self, batch):
+        existing = self.groups(record['slug'] for record in batch)
+        groups = {
+            record['slug']: Group(
+                slug=record['slug'],
+                title=record['title'],
+                description=record['description'],
+            )
+            for record in batch if record['slug'] not in existing
+        }
+        Group.objects.bulk_create(groups.values())
+        feed_cache.bump((feed_cache.INDEX, None))
+        return len(groups)
+
+    def load_posts(self, batch):
+        for record in batch:
+            record['pub_date'] = parse_datetime(record['pub_date'])
+        users = self.users(record['author'] for record in batch)
+        groups = self.groups(
+            record['group'] for record in batch if record['group'])
+        existing = self.posts(
+            [(record['author'], record['pub_date']) for record in batch])
+        posts = []
+        keys = set()
+        for record in batch:
+            key = (record['author'], record['pub_date'])
+            # Comments refer to posts by this key: it has to be unique
+            if key in keys:
+                raise ValueError(f'Duplicate post key {key}')
+            keys.add(key)
+            if key in existing:
+                continue
+            image = self.media(record['image'])
+            posts.append(Post(
+                author_id=users[record['author']],
+                pub_date=record['pub_date'],
+                text=record['text'],
+                group_id=groups.get(record['group']),
+                image=image,
+                compact_image=(
+                    self.media(record['compact_image'], 'compact_image')
+                    if image else ''),
+                image_width=record['image_width'] if image else None,
+                image_height=record['image_height'] if image else None,
+            ))
+        Post.objects.bulk_create(posts)
+        feed_cache.bump(*{
+            feed for post in posts
+            for feed in feed_cache.post_feeds(post.author_id, post.group_id)
+        })
+        return len(posts)
+
+    def load_comments(self, batch):
+        for record in batch:
+            record['post'] = (
+                record['post'][0], parse_datetime(record['post'][1]))
+            record['created'] = parse_datetime(record['created'])
+        users = self.users(record['author'] for record in batch)
+        posts = self.posts([record['post'] for record in batch])
+        existing = set(Comment.objects.filter(
+            post_id__in=set(posts.values()),
+            created__in={record['created'] for record in batch},
+        ).values_list('post_id', 'author_id', 'created'))
+        comments = []
+        for record in batch:
+            post_id = posts.get(record['post'])
+            if post_id is None:
+                logger.warning('Post %s for a comment is missing',
+                               record['post'])
+                continue
+            key = (post_id, users[record['author']], record['created'])
+            if key in existing:
+                continue
+            existing.add(key)
+            comments.append(Comment(
+                post_id=post_id,
+                author_id=key[1],
+                created=record['created'],
+                text=record['text'],
+            ))
+        Comment.objects.bulk_create(comments)
+        feed_cache.bump((feed_cache.INDEX, None), *{
+            (feed_cache.POST, comment.post_id) for comment in comments
+        })
+        return len(comments)
+
+    def load_follows(self, batch):
+        users = self.users(
+            name for record in batch
+            for name in (record['user'], record['author'])
+        )
+        follows = [
+            Follow(user_id=users[record['user']],
+                   author_id=users[record['author']])
+            for record in batch if record['user'] != record['author']
+        ]
+        # unique_together makes repeated imports safe
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        feed_cache.bump(*{
+            feed for follow in follows
+            for feed in (
+                (feed_cache.FOLLOW, follow.user_id),
+                (feed_cache.PROFILE, follow.user_id),
+                (feed_cache.PROFILE, follow.author_id),
+            )
+        })
+        return len(follows)
+
+    def finish(self):
+        rebuild_derived(self.batch_size)
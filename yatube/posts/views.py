@@ -1,77 +1,166 @@
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render, get_object_or_404, redirect
-from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import Http404
+from django.shortcuts import render, redirect
+from django.views.decorators.http import condition
+
+from core import donut
+
+from .models import Comment, Follow, Group, Post
+from .forms import CommentForm, PostForm, SearchForm
+from .pagination import (COMMENT_ORDERING, COMMENTS_PER_PAGE,
+                         POSTS_PER_PAGE, CursorPaginator, paginate)
+from . import (etags, feed_cache, fulltext, lookups, thumbnails,
+               timeline)
 
-from .models import Comment, Follow, Group, Post, User
-from .forms import CommentForm, PostForm
 
-POSTS_PER_PAGE = settings.POSTS_PER_PAGE
+def comments_page(request, post_id):
+    """Пачка комментариев поста после курсора ?after=, новые сверху."""
+    comments = Comment.objects.filter(
+        post_id=post_id).select_related('author')
+    paginator = CursorPaginator(
+        comments, COMMENTS_PER_PAGE, COMMENT_ORDERING)
+    return paginator.get_page(after=request.GET.get('after'))
 
 
+def get_user_or_404(username):
+    author = lookups.user(username)
+    if author is None:
+        raise Http404
+    return author
+
+
+@condition(etag_func=etags.index)
 def index(request):
     template = 'posts/index.html'
-    title = 'Последние обновления на сайте'
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    context = {
-        'title': title,
-        'page_obj': page_obj,
-    }
-    return render(request, template, context)
+
+    def shared():
+        title = 'Последние обновления на сайте'
+        post_list = Post.objects.select_related('author', 'group')
+        page_obj = paginate(request, post_list)
+        context = {
+            'title': title,
+            'page_obj': page_obj,
+        }
+        context.update(feed_cache.fragment_context(
+            request, (feed_cache.INDEX, None)))
+        return context
+
+    return donut.render(request, template, shared)
 
 
+@condition(etag_func=etags.group_posts)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.group.all()
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    title = f'Записи сообщества {Group.__str__(group)}'
-    context = {
-        'group': group,
-        'page_obj': page_obj,
-        'title': title,
-    }
-    return render(request, template, context)
-
 
+    def shared():
+        group = lookups.group(slug)
+        if group is None:
+            raise Http404
+        post_list = group.group.select_related('author', 'group')
+        page_obj = paginate(request, post_list)
+        title = f'Записи сообщества {Group.__str__(group)}'
+        context = {
+            'group': group,
+            'page_obj': page_obj,
+            'title': title,
+        }
+        context.update(feed_cache.fragment_context(
+            request, (feed_cache.GROUP, group.pk)))
+        return context
+
+    return donut.render(request, template, shared)
+
+
+@condition(etag_func=etags.profile)
 def profile(request, username):
     template = 'posts/profile.html'
     following = False
-    author = User.objects.get(username=username)
+    author = get_user_or_404(username)
     if request.user.is_authenticated:
         user = request.user
-        if Follow.objects.filter(user=user, author=author):
-            following = True
-    post_list = Post.objects.filter(author=author)
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    title = f'Профайл пользователя {username}'
+        following = Follow.objects.filter(
+            user=user, author=author).exists()
+
+    def shared():
+        post_list = Post.objects.filter(author=author).select_related(
+            'author', 'group')
+        page_obj = paginate(request, post_list)
+        title = f'Профайл пользователя {username}'
+        context = {
+            'page_obj': page_obj,
+            'title': title,
+        }
+        context.update(feed_cache.fragment_context(
+            request, (feed_cache.PROFILE, author.pk)))
+        return context
+
+    # The follow button differs per viewer
     context = {
         'author': author,
-        'page_obj': page_obj,
-        'title': title,
         'following': following,
     }
-    return render(request, template, context)
+    return donut.render(request, template, shared, context)
 
 
+@condition(etag_func=etags.post_detail)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = Post.objects.get(pk=post_id)
-    title = f'Пост {post.text[:30]}'
-    comments = Comment.objects.filter(post_id=post_id)
-    form = CommentForm()
-    context = {  # post_count теперь в шаблоне
-        'post': post,
-        'title': title,
+    post = None
+
+    def viewer():
+        # The comment form and the edit button differ per viewer
+        nonlocal post
+        post = Post.objects.select_related(
+            'author__profile', 'group').get(pk=post_id)
+        return {
+            'post': post,
+            'form': CommentForm(),
+        }
+
+    def shared():
+        title = f'Пост {post.text[:30]}'
+        # The first batch only, the rest is loaded by post_comments
+        comments = comments_page(request, post_id)
+        return {  # post_count теперь в шаблоне
+            'title': title,
+            'comments': comments,
+        }
+
+    return donut.render(request, template, shared, viewer)
+
+
+@condition(etag_func=etags.post_comments)
+def post_comments(request, post_id):
+    """Следующая пачка комментариев: HTML-фрагмент без страницы."""
+    comments = comments_page(request, post_id)
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return render(request, 'posts/includes/comment_list.html', {
+        'post_id': post_id,
         'comments': comments,
-        'form': form
+    })
+
+
+def search(request):
+    template = 'posts/search.html'
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid():
+        post_list = fulltext.search(
+            form.cleaned_data['q'],
+            group=form.cleaned_data['group'],
+            author=form.cleaned_data['author'],
+        )
+        paginator = Paginator(post_list, POSTS_PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    query = request.GET.copy()
+    query.pop('page', None)
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'title': 'Поиск по записям',
+        'pagination_query': f'{query.urlencode()}&' if query else '',
     }
     return render(request, template, context)
 
@@ -87,6 +176,7 @@ def post_create(request):
         form = form.save(commit=False)
         form.author = request.user
         form.save()
+        thumbnails.queue(form)
         return redirect('posts:profile', form.author)
     return render(request, template, {'form': form})
 
@@ -104,6 +194,7 @@ def post_edit(request, post_id):
             form = form.save(commit=False)
             form.author = request.user
             form.save()
+            thumbnails.queue(form)
             return redirect('posts:post_detail', post_id)
         return render(request, template, {'form': form, 'is_edit': True})
     return redirect('posts:post_detail', post_id)
@@ -122,27 +213,33 @@ def add_comment(request, post_id):
 
 
 @login_required
+@condition(etag_func=etags.follow_index)
 def follow_index(request):
     template = 'posts/follow.html'
     user = request.user
-    # list of followed authors
-    following = Follow.objects.values_list('author').filter(user=user)
-    # Posts of all authors
-    post_list = Post.objects.filter(author__in=following)
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    title = f'Подписки пользователя {user.username}'
-    context = {
-        'page_obj': page_obj,
-        'title': title,
-    }
-    return render(request, template, context)
+
+    def shared():
+        # materialized timeline merged with large authors at read time
+        post_list = timeline.posts_for(user).select_related(
+            'author', 'group')
+        page_obj = paginate(request, post_list)
+        title = f'Подписки пользователя {user.username}'
+        context = {
+            'page_obj': page_obj,
+            'title': title,
+        }
+        context.update(feed_cache.fragment_context(
+            request,
+            (feed_cache.INDEX, None), (feed_cache.FOLLOW, user.pk)))
+        return context
+
+    # The FOLLOW version scopes the shell to this reader
+    return donut.render(request, template, shared)
 
 
 @login_required
 def profile_follow(request, username):
-    author = User.objects.get(username=username)
+    author = get_user_or_404(username)
     user = request.user
     if user != author:
         Follow.objects.get_or_create(user=user, author=author)
@@ -151,7 +248,7 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = User.objects.get(username=username)
+    author = get_user_or_404(username)
     user = request.user
     Follow.objects.filter(user=user, author=author).delete()
     return redirect('posts:profile', author)
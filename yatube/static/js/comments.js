@@ -0,0 +1,42 @@
+// Loads the next batch of comments when the "more" link scrolls into view
+(function () {
+  if (window.commentsLoader || !('IntersectionObserver' in window)) {
+    return;
+  }
+
+  function load(link) {
+    observer.unobserve(link);
+    fetch(link.dataset.commentsUrl, {credentials: 'same-origin'})
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.status);
+        }
+        return response.text();
+      })
+      .then(function (html) {
+        link.insertAdjacentHTML('beforebegin', html);
+        link.remove();
+        watch();
+      })
+      .catch(function () {
+        // Not retried: the link still opens the next batch as a page
+      });
+  }
+
+  var observer = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      if (entry.isIntersecting) {
+        load(entry.target);
+      }
+    });
+  }, {rootMargin: '400px'});
+
+  function watch() {
+    document.querySelectorAll('[data-comments-url]').forEach(function (link) {
+      observer.observe(link);
+    });
+  }
+
+  window.commentsLoader = true;
+  document.addEventListener('DOMContentLoaded', watch);
+})();
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_profile'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['followers_count', 'user'], name='profile_followers_idx'),
+        ),
+    ]
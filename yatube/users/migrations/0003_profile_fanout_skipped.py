@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_followers_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='fanout_skipped',
+            field=models.BooleanField(default=False, help_text='Автор был крупным: после спада подписчиков ленты нужно дозаполнить', verbose_name='Посты не разложены по лентам'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import models
+
+
+class Profile(models.Model):
+    """Денормализованные счетчики пользователя."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='profile'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    fanout_skipped = models.BooleanField(
+        'Посты не разложены по лентам',
+        default=False,
+        help_text='Автор был крупным: после спада подписчиков '
+                  'ленты нужно дозаполнить'
+    )
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+        # Large authors of the follow feed: covering, no table access
+        indexes = (
+            models.Index(fields=('followers_count', 'user'),
+                         name='profile_followers_idx'),
+        )
+
+    def __str__(self):
+        return str(self.user)
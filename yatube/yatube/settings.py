@@ -43,7 +43,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SlowQueryMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,7 +68,9 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to /metrics
+        'BACKEND': 'core.metrics.DjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -92,6 +98,27 @@ DATABASES = {
     }
 }
 
+# read-only copies of default, comma separated SQLite paths
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.getenv('REPLICA_DATABASES', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        # tests read the test database through replica aliases
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# after a write the client reads from default this long, replicas catch up
+REPLICA_PIN_SECONDS = 5
+REPLICA_PIN_COOKIE = 'pin_primary'
+
+# PRAGMA name -> value for every SQLite connection, see settings_production
+SQLITE_PRAGMAS = {}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -146,6 +173,23 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent emails')
 
 # pages per page for paginator
 POSTS_PER_PAGE = 10
+# comments rendered with a post, the rest load in batches on scroll
+COMMENTS_PER_PAGE = 20
+# 'page' - номера страниц, 'cursor' - keyset-пагинация (?after=/?before=)
+POSTS_PAGINATION_MODE = os.getenv('POSTS_PAGINATION_MODE', 'page')
+
+# authors with more followers are merged into follow feed at read time
+TIMELINE_FANOUT_LIMIT = 1000
+
+# uploaded post images are downscaled to fit this box and re-encoded
+POST_IMAGE_MAX_SIZE = 2048
+POST_IMAGE_QUALITY = 85
+
+# thumbnail widths offered to browsers in srcset
+THUMBNAIL_SRCSET_WIDTHS = (360, 480, 720)
+
+# process pool size for thumbnail pre-generation, 0 - in request
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 2))
 
 # empty value for admin
 EMPTY_VALUE_DISPLAY = '-пусто-'
@@ -153,8 +197,60 @@ EMPTY_VALUE_DISPLAY = '-пусто-'
 # csrf 403 custom view
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# feed fragments are invalidated by version counters, TTL may be long
+FEED_CACHE_TTL = 60 * 60 * 3
+
+# in-process User/Group lookups; other workers see edits after the TTL
+LOOKUP_CACHE_SIZE = 1024
+LOOKUP_CACHE_TTL = 60
+
+# per-process metric files, merged by /metrics; unset - one process
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 5
+
+# addresses allowed to scrape /metrics
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split(',')
+
+# queries slower than this many ms are logged with their plan, unset - off
+SLOW_QUERY_MS = (
+    float(os.getenv('SLOW_QUERY_MS')) if os.getenv('SLOW_QUERY_MS') else None
+)
+# one record per query pattern per this many seconds
+SLOW_QUERY_LOG_INTERVAL = 60
+
+# debug_toolbar takes over the root logger: slow queries get a console
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.slow_queries': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
+
+# whole pages for visitors without a session, invalidated by feed versions
+PAGE_CACHE_TTL = 60 * 60 * 24
+PAGE_CACHE_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:post_comments',
+    'about:author',
+    'about:tech',
+)
+
+# worker processes serving the site; they must share the cache below
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+
+# Feed versions live here: a per-process LocMem cache only suits a single
+# development process, production overrides it with a shared backend.
+# Version counters never expire, culling must not evict them.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
     }
 }
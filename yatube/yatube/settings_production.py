@@ -0,0 +1,59 @@
+"""
+Настройки продакшена: DJANGO_SETTINGS_MODULE=yatube.settings_production.
+
+Без DEBUG и debug_toolbar, с постоянными соединениями и SQLite в режиме
+WAL: читатели не ждут писателей, а писатели ждут друг друга
+busy_timeout, а не падают с database is locked. Кэш общий для всех
+воркеров: memcached из MEMCACHED_LOCATION или файлы в CACHE_DIR.
+"""
+import os
+
+from . import settings as base
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost').split(',')
+
+INSTALLED_APPS = [
+    app for app in base.INSTALLED_APPS if app != 'debug_toolbar'
+]
+MIDDLEWARE = [
+    middleware for middleware in base.MIDDLEWARE
+    if not middleware.startswith('debug_toolbar.')
+]
+
+DATABASES = {
+    alias: {**database, 'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 600))}
+    for alias, database in base.DATABASES.items()
+}
+
+# Shared by all workers: feed versions must reach every process.
+# Memcached when configured, otherwise files next to the database.
+if os.getenv('MEMCACHED_LOCATION'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.getenv('MEMCACHED_LOCATION').split(','),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv(
+                'CACHE_DIR', os.path.join(base.BASE_DIR, 'cache')),
+            'OPTIONS': {'MAX_ENTRIES': 1000000},
+        }
+    }
+
+# applied by core on every new SQLite connection
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # WAL keeps the database consistent, a power loss may lose the tail
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # negative - in KiB
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+}
@@ -3,12 +3,16 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import include, path  # sorted import
 
+from core.views import metrics
+
 urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('posts.api_urls', namespace='api')),
     path('', include('posts.urls', namespace='posts')),  # changed order
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
 ]
 
 handler404 = 'core.views.page_not_found'